@@ -3,15 +3,18 @@ from django.db.utils import OperationalError, ProgrammingError
 from .models import AuditLog
 
 
+def request_ip(request):
+    if not request:
+        return ""
+    forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    if forwarded_for:
+        return forwarded_for.split(",")[0].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
 def log_event(actor, action, object_type, object_id, request=None, metadata=None):
     try:
-        ip = ""
-        if request:
-            forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR", "")
-            if forwarded_for:
-                ip = forwarded_for.split(",")[0].strip()
-            else:
-                ip = request.META.get("REMOTE_ADDR", "")
+        ip = request_ip(request)
         return AuditLog.objects.create(
             actor=actor,
             action=action,
@@ -22,3 +25,23 @@ def log_event(actor, action, object_type, object_id, request=None, metadata=None
         )
     except (OperationalError, ProgrammingError):
         return None
+
+
+def log_events(actor, action, object_type, entries, request=None):
+    # entries: iterable of (object_id, metadata) pairs, written with one bulk insert.
+    ip = request_ip(request)
+    logs = [
+        AuditLog(
+            actor=actor,
+            action=action,
+            object_type=object_type,
+            object_id=str(object_id),
+            ip=ip,
+            metadata=metadata or {},
+        )
+        for object_id, metadata in entries
+    ]
+    try:
+        return AuditLog.objects.bulk_create(logs, batch_size=500)
+    except (OperationalError, ProgrammingError):
+        return []
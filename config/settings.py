@@ -103,3 +103,48 @@ LOGOUT_REDIRECT_URL = "login"
 
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
+
+# Write-behind acknowledges telemetry before it is durable; it is off unless enabled here and
+# TELEMETRY_FLUSH_INTERVAL_MS is positive.
+TELEMETRY_WRITE_BEHIND = os.getenv("TELEMETRY_WRITE_BEHIND", "0") == "1"
+TELEMETRY_FLUSH_INTERVAL_MS = int(os.getenv("TELEMETRY_FLUSH_INTERVAL_MS", "500"))
+TELEMETRY_ARCHIVE_ROOT = Path(os.getenv("TELEMETRY_ARCHIVE_ROOT", BASE_DIR / "telemetry_archive"))
+TELEMETRY_ARCHIVE_ON_END = os.getenv("TELEMETRY_ARCHIVE_ON_END", "1") == "1"
+# Seconds to wait after a session ends before archiving; defaults to two flush intervals + 1 s.
+TELEMETRY_ARCHIVE_DELAY = (
+    float(os.environ["TELEMETRY_ARCHIVE_DELAY"]) if os.getenv("TELEMETRY_ARCHIVE_DELAY") else None
+)
+# Serve telemetry streams from WSGI worker threads (each open stream holds one thread).
+TELEMETRY_STREAM_SYNC = os.getenv("TELEMETRY_STREAM_SYNC", "0") == "1"
+TELEMETRY_DELTA_CACHE_SIZE = int(os.getenv("TELEMETRY_DELTA_CACHE_SIZE", "10000"))
+FLEET_STATS_TTL = float(os.getenv("FLEET_STATS_TTL", "5"))
+AGENT_TOKEN_CACHE_TTL = float(os.getenv("AGENT_TOKEN_CACHE_TTL", "60"))
+AGENT_TOKEN_CACHE_SIZE = int(os.getenv("AGENT_TOKEN_CACHE_SIZE", "10000"))
+AGENT_SIGNATURE_MAX_SKEW = int(os.getenv("AGENT_SIGNATURE_MAX_SKEW", "30"))
+AGENT_SIGNING_KEYS_REFRESH = float(os.getenv("AGENT_SIGNING_KEYS_REFRESH", "60"))
+AGENT_SIGNATURE_REPLAY_CACHE_SIZE = int(os.getenv("AGENT_SIGNATURE_REPLAY_CACHE_SIZE", "100000"))
+AGENT_RATE_LIMIT_ENABLED = os.getenv("AGENT_RATE_LIMIT_ENABLED", "1") == "1"
+# Token buckets as (requests per second, burst), per drone and across all drones.
+AGENT_RATE_LIMITS = {
+    "register": {"drone": (1 / 60, 3), "global": (50, 200)},
+    "telemetry": {"drone": (5, 20), "global": (2000, 4000)},
+    "gateway": {"drone": (5, 20), "global": (200, 400)},
+    "commands": {"drone": (2, 10), "global": (1000, 2000)},
+    "ack": {"drone": (5, 20), "global": (1000, 2000)},
+    "heartbeat": {"drone": (5, 20), "global": (2000, 4000)},
+    "routes": {"drone": (1, 5), "global": (200, 400)},
+}
+AGENT_COMMAND_LONG_POLL_MAX = float(os.getenv("AGENT_COMMAND_LONG_POLL_MAX", "25"))
+# "inprocess" for a single worker, "socket" to share command and telemetry wake-ups and
+# credential invalidations between workers on a host.
+AGENT_COMMAND_BUS = os.getenv("AGENT_COMMAND_BUS", "inprocess")
+AGENT_COMMAND_BUS_DIR = os.getenv("AGENT_COMMAND_BUS_DIR") or None
+# ACKED/FAILED commands older than this move to the archive table (manage.py archive_commands).
+AGENT_COMMAND_ARCHIVE_AFTER_DAYS = float(os.getenv("AGENT_COMMAND_ARCHIVE_AFTER_DAYS", "7"))
+# Seconds a SENT command may wait for its ACK, and how many deliveries it gets before failing.
+AGENT_COMMAND_POLICIES = {
+    "START_MISSION": {"timeout": 60, "max_attempts": 3},
+    "END_MISSION": {"timeout": 60, "max_attempts": 5},
+    "RETURN_HOME": {"timeout": 30, "max_attempts": 5},
+    "PING": {"timeout": 30, "max_attempts": 1},
+}
@@ -0,0 +1,70 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from alerts.models import Alert
+from fleet.models import Drone
+from ops.models import Shift
+
+ONLINE_WINDOW = timedelta(minutes=10)
+EMPTY_FLEET_STATS = {
+    "online_threshold": None,
+    "drones_online": 0,
+    "drones_available": 0,
+    "drones_in_use": 0,
+    "drones_maintenance": 0,
+    "drones_lost_link": 0,
+    "pilots_active": 0,
+    "alerts_open": 0,
+    "alerts_critical": 0,
+}
+
+
+def compute_fleet_stats(now=None):
+    # One conditional aggregate per table instead of one COUNT per figure.
+    online_threshold = (now or timezone.now()) - ONLINE_WINDOW
+    drones = Drone.objects.aggregate(
+        drones_online=Count("id", filter=Q(last_seen__gte=online_threshold)),
+        drones_available=Count("id", filter=Q(status=Drone.Status.AVAILABLE)),
+        drones_in_use=Count("id", filter=Q(status=Drone.Status.IN_USE)),
+        drones_maintenance=Count("id", filter=Q(status=Drone.Status.MAINTENANCE)),
+        drones_lost_link=Count("id", filter=Q(status=Drone.Status.LOST_LINK)),
+    )
+    alerts = Alert.objects.aggregate(
+        alerts_open=Count("id", filter=Q(status=Alert.Status.OPEN)),
+        alerts_critical=Count("id", filter=Q(severity=Alert.Severity.CRITICAL)),
+    )
+    pilots = Shift.objects.filter(status=Shift.Status.ACTIVE).aggregate(
+        pilots_active=Count("pilot", distinct=True)
+    )
+    return {"online_threshold": online_threshold, **drones, **alerts, **pilots}
+
+
+class FleetStatsCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = None
+        self._expires_at = 0.0
+
+    @property
+    def ttl(self):
+        return getattr(settings, "FLEET_STATS_TTL", 5)
+
+    def get(self):
+        # Holding the lock while computing keeps concurrent page loads to one set of queries.
+        with self._lock:
+            if self._stats is None or self._expires_at <= time.monotonic():
+                self._stats = compute_fleet_stats()
+                self._expires_at = time.monotonic() + self.ttl
+            return dict(self._stats)
+
+    def invalidate(self):
+        with self._lock:
+            self._stats = None
+
+
+fleet_stats = FleetStatsCache()
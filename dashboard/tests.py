@@ -1,5 +1,14 @@
-from django.test import Client, TestCase
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
+
+from alerts.models import Alert
+from dashboard.stats import compute_fleet_stats, fleet_stats
+from fleet.models import Drone
+from ops.models import Route, Shift
 
 
 class SmokeTests(TestCase):
@@ -7,3 +16,81 @@ class SmokeTests(TestCase):
         client = Client()
         response = client.get(reverse("login"))
         self.assertEqual(response.status_code, 200)
+
+
+@override_settings(TELEMETRY_WRITE_BEHIND=False)
+class TelemetryPartialTests(TestCase):
+    def setUp(self):
+        self.pilot = get_user_model().objects.create_user(username="pilot-p01", password="x")
+        self.drone = Drone.objects.create(
+            serial="DRX-P01", model="Falcon", last_seen=timezone.now()
+        )
+        route = Route.objects.create(name="Ruta P", zone_geojson={}, waypoints=[])
+        now = timezone.now()
+        Shift.objects.create(
+            pilot=self.pilot,
+            drone=self.drone,
+            route=route,
+            start_at=now,
+            end_at=now + timedelta(hours=1),
+        )
+        self.client = Client()
+        self.client.force_login(self.pilot)
+
+    def test_unchanged_poll_returns_304(self):
+        url = reverse("pilot-operation-telemetry")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Drone.objects.filter(pk=self.drone.pk).update(
+            last_seen=timezone.now() + timedelta(seconds=1)
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_wsgi_stream_falls_back_to_polling_by_default(self):
+        url = reverse("pilot-operation-telemetry-stream", args=[self.drone.pk])
+        self.assertEqual(self.client.get(url).status_code, 204)
+
+
+class FleetStatsTests(TestCase):
+    def setUp(self):
+        fleet_stats.invalidate()
+
+    def test_counts_in_one_query_per_table_and_caches(self):
+        pilot = get_user_model().objects.create_user(username="pilot-s01", password="x")
+        now = timezone.now()
+        Drone.objects.create(serial="DRX-S01", model="Falcon", last_seen=now)
+        Drone.objects.create(serial="DRX-S02", model="Falcon", status=Drone.Status.IN_USE)
+        Drone.objects.create(serial="DRX-S03", model="Falcon", status=Drone.Status.LOST_LINK)
+        Alert.objects.create(
+            created_by=pilot,
+            category=Alert.Categories.OTHER,
+            severity=Alert.Severity.CRITICAL,
+            target=Alert.Target.ADMIN,
+            description="x",
+        )
+
+        with self.assertNumQueries(3):
+            stats = compute_fleet_stats(now)
+        self.assertEqual(
+            {key: value for key, value in stats.items() if key != "online_threshold"},
+            {
+                "drones_online": 1,
+                "drones_available": 1,
+                "drones_in_use": 1,
+                "drones_maintenance": 0,
+                "drones_lost_link": 1,
+                "pilots_active": 0,
+                "alerts_open": 1,
+                "alerts_critical": 1,
+            },
+        )
+
+        fleet_stats.get()
+        with self.assertNumQueries(0):
+            self.assertEqual(fleet_stats.get()["drones_in_use"], 1)
@@ -1,7 +1,7 @@
 from django.urls import path
 
 from alerts.views import AdminAlertListView
-from dashboard.views import admin_dashboard
+from dashboard.views import admin_dashboard, telemetry_stream
 from ops.views import DispatchCreateView, activate_shift, cancel_shift
 
 urlpatterns = [
@@ -10,4 +10,9 @@ urlpatterns = [
     path("alerts/", AdminAlertListView.as_view(), name="admin-alert-center"),
     path("shifts/<int:shift_id>/activate/", activate_shift, name="admin-shift-activate"),
     path("shifts/<int:shift_id>/cancel/", cancel_shift, name="admin-shift-cancel"),
+    path(
+        "drones/<int:drone_id>/telemetry/stream/",
+        telemetry_stream,
+        name="admin-drone-telemetry-stream",
+    ),
 ]
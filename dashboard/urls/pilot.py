@@ -6,6 +6,7 @@ from dashboard.views import (
     pilot_operation_telemetry_partial,
     pilot_operation_view,
     start_operation,
+    telemetry_stream,
 )
 
 urlpatterns = [
@@ -16,6 +17,11 @@ urlpatterns = [
         pilot_operation_telemetry_partial,
         name="pilot-operation-telemetry",
     ),
+    path(
+        "operation/telemetry/stream/<int:drone_id>/",
+        telemetry_stream,
+        name="pilot-operation-telemetry-stream",
+    ),
     path("operation/start/", start_operation, name="pilot-operation-start"),
     path("operation/end/", end_operation, name="pilot-operation-end"),
 ]
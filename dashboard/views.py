@@ -1,23 +1,53 @@
 from datetime import timedelta
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
 from django.db import transaction
 from django.db.models import Case, IntegerField, Q, Value, When
 from django.db.utils import OperationalError, ProgrammingError
-from django.shortcuts import redirect, render
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 from django.utils import timezone
-from django.views.decorators.http import require_POST
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_POST
 
 from accounts.decorators import role_required
+from accounts.models import Profile
 from alerts.forms import AlertForm
 from alerts.models import Alert
 from audit.models import AuditLog
 from audit.utils import log_event
+from dashboard.stats import EMPTY_FLEET_STATS, fleet_stats
 from fleet.models import Drone
+from integrations.archive import archive_session_in_background
+from integrations.buffer import state_buffer
+from integrations.bus import telemetry_bus
+from integrations.command_archive import latest_command
 from integrations.models import AgentCommand
+from integrations.routes import mission_payload
 from ops.models import OperationSession, Route, Shift
 
+STREAM_KEEPALIVE_SECONDS = 15
+
+
+def current_shift_queryset(user):
+    return (
+        Shift.objects.filter(pilot=user)
+        .exclude(status=Shift.Status.CANCELLED)
+        .annotate(
+            status_priority=Case(
+                When(status=Shift.Status.ACTIVE, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by("status_priority", "start_at")
+    )
+
 
 @login_required
 @role_required("ADMIN")
@@ -26,17 +56,7 @@ def admin_dashboard(request):
     today = now.date()
     requires_migrations = False
     try:
-        online_threshold = now - timedelta(minutes=10)
-        drones_online = Drone.objects.filter(last_seen__gte=online_threshold).count()
-        drones_available = Drone.objects.filter(status=Drone.Status.AVAILABLE).count()
-        drones_in_use = Drone.objects.filter(status=Drone.Status.IN_USE).count()
-        drones_maintenance = Drone.objects.filter(status=Drone.Status.MAINTENANCE).count()
-        drones_lost_link = Drone.objects.filter(status=Drone.Status.LOST_LINK).count()
-        pilots_active = (
-            Shift.objects.filter(status=Shift.Status.ACTIVE).values("pilot_id").distinct().count()
-        )
-        alerts_open = Alert.objects.filter(status=Alert.Status.OPEN).count()
-        alerts_critical = Alert.objects.filter(severity=Alert.Severity.CRITICAL).count()
+        stats = fleet_stats.get()
         shifts_today = Shift.objects.filter(start_at__date=today).order_by("start_at")[:10]
         alert_queue = Alert.objects.order_by("-created_at")
         audit_events = AuditLog.objects.order_by("-created_at")[:20]
@@ -52,8 +72,7 @@ def admin_dashboard(request):
         )
     except (OperationalError, ProgrammingError):
         requires_migrations = True
-        drones_online = drones_available = drones_in_use = drones_maintenance = drones_lost_link = 0
-        pilots_active = alerts_open = alerts_critical = 0
+        stats = EMPTY_FLEET_STATS
         shifts_today = []
         alert_queue = []
         audit_events = []
@@ -78,15 +97,7 @@ def admin_dashboard(request):
         {
             "requires_migrations": requires_migrations,
             "now": now,
-            "online_threshold": online_threshold if not requires_migrations else None,
-            "drones_online": drones_online,
-            "drones_available": drones_available,
-            "drones_in_use": drones_in_use,
-            "drones_maintenance": drones_maintenance,
-            "drones_lost_link": drones_lost_link,
-            "pilots_active": pilots_active,
-            "alerts_open": alerts_open,
-            "alerts_critical": alerts_critical,
+            **stats,
             "shifts_today": shifts_today,
             "alert_queue": alert_queue,
             "audit_events": audit_events,
@@ -106,19 +117,7 @@ def pilot_dashboard(request):
     now = timezone.now()
     requires_migrations = False
     try:
-        shift = (
-            Shift.objects.filter(pilot=request.user)
-            .exclude(status=Shift.Status.CANCELLED)
-            .annotate(
-                status_priority=Case(
-                    When(status=Shift.Status.ACTIVE, then=Value(0)),
-                    default=Value(1),
-                    output_field=IntegerField(),
-                )
-            )
-            .order_by("status_priority", "start_at")
-            .first()
-        )
+        shift = current_shift_queryset(request.user).first()
         current_session = None
         if shift:
             current_session = OperationSession.objects.filter(
@@ -133,11 +132,7 @@ def pilot_dashboard(request):
             .distinct()
             .order_by("-created_at")[:5]
         )
-        last_command = (
-            AgentCommand.objects.filter(drone=shift.drone).order_by("-created_at").first()
-            if shift
-            else None
-        )
+        last_command = latest_command(shift.drone) if shift else None
     except (OperationalError, ProgrammingError):
         requires_migrations = True
         shift = None
@@ -147,6 +142,8 @@ def pilot_dashboard(request):
         last_command = None
 
     agent_online = False
+    if shift:
+        state_buffer.overlay(shift.drone)
     if shift and shift.drone.last_seen:
         agent_online = shift.drone.last_seen >= now - timedelta(minutes=10)
 
@@ -171,19 +168,7 @@ def pilot_dashboard(request):
 def pilot_operation_view(request):
     now = timezone.now()
     try:
-        shift = (
-            Shift.objects.filter(pilot=request.user)
-            .exclude(status=Shift.Status.CANCELLED)
-            .annotate(
-                status_priority=Case(
-                    When(status=Shift.Status.ACTIVE, then=Value(0)),
-                    default=Value(1),
-                    output_field=IntegerField(),
-                )
-            )
-            .order_by("status_priority", "start_at")
-            .first()
-        )
+        shift = current_shift_queryset(request.user).first()
     except (OperationalError, ProgrammingError):
         messages.error(request, "No hay datos disponibles. Ejecuta las migraciones.")
         return redirect("pilot-dashboard")
@@ -195,9 +180,10 @@ def pilot_operation_view(request):
     current_session = OperationSession.objects.filter(
         shift=shift, status=OperationSession.Status.RUNNING
     ).first()
-    last_command = AgentCommand.objects.filter(drone=shift.drone).order_by("-created_at").first()
+    last_command = latest_command(shift.drone)
     alert_form = AlertForm()
 
+    state_buffer.overlay(shift.drone)
     agent_online = False
     if shift.drone.last_seen:
         agent_online = shift.drone.last_seen >= now - timedelta(minutes=10)
@@ -209,7 +195,11 @@ def pilot_operation_view(request):
         last_command
         and last_command.status in [AgentCommand.Status.PENDING, AgentCommand.Status.SENT]
     )
-    command_feedback = "Awaiting drone ACK..." if awaiting_ack else None
+    command_feedback = None
+    if awaiting_ack:
+        command_feedback = "Awaiting drone ACK..."
+    elif last_command and last_command.status == AgentCommand.Status.FAILED:
+        command_feedback = "Command failed: the drone did not ACK it."
     control_status = (
         "LIVE / CONTROL ACTIVE"
         if last_command and last_command.status == AgentCommand.Status.ACKED
@@ -232,28 +222,106 @@ def pilot_operation_view(request):
     )
 
 
+def telemetry_partial_state(request):
+    # One light query shared by the ETag and Last-Modified checks of a poll.
+    if not hasattr(request, "_telemetry_partial_state"):
+        try:
+            row = (
+                current_shift_queryset(request.user)
+                .values_list("drone_id", "drone__last_seen")
+                .first()
+            )
+        except (OperationalError, ProgrammingError):
+            row = None
+        if row:
+            drone_pk, last_seen = row
+            row = (drone_pk, state_buffer.pending_state(drone_pk).get("last_seen", last_seen))
+        request._telemetry_partial_state = row
+    return request._telemetry_partial_state
+
+
+def telemetry_partial_etag(request):
+    state = telemetry_partial_state(request)
+    if not state:
+        return "no-drone"
+    drone_pk, last_seen = state
+    return f"drone-{drone_pk}-{last_seen.timestamp() if last_seen else 0}"
+
+
+def telemetry_partial_last_modified(request):
+    state = telemetry_partial_state(request)
+    return state[1] if state else None
+
+
 @login_required
 @role_required("PILOT")
+@condition(etag_func=telemetry_partial_etag, last_modified_func=telemetry_partial_last_modified)
 def pilot_operation_telemetry_partial(request):
     try:
-        shift = (
-            Shift.objects.filter(pilot=request.user)
-            .exclude(status=Shift.Status.CANCELLED)
-            .annotate(
-                status_priority=Case(
-                    When(status=Shift.Status.ACTIVE, then=Value(0)),
-                    default=Value(1),
-                    output_field=IntegerField(),
-                )
-            )
-            .order_by("status_priority", "start_at")
-            .first()
-        )
+        shift = current_shift_queryset(request.user).select_related("drone").first()
     except (OperationalError, ProgrammingError):
         shift = None
 
-    drone = shift.drone if shift else None
-    return render(request, "pilot/partials/telemetry.html", {"drone": drone})
+    drone = state_buffer.overlay(shift.drone) if shift else None
+    response = render(request, "pilot/partials/telemetry.html", {"drone": drone})
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def telemetry_event(drone_pk):
+    version = telemetry_bus.version(drone_pk)
+    drone = state_buffer.overlay(Drone.objects.filter(pk=drone_pk).first())
+    html = render_to_string("pilot/partials/telemetry.html", {"drone": drone})
+    data = "\n".join(f"data: {line}" for line in html.splitlines())
+    return f"event: telemetry\nid: {version}\n{data}\n\n"
+
+
+def telemetry_event_stream(drone_pk):
+    with telemetry_bus.subscribe(drone_pk) as subscription:
+        yield telemetry_event(drone_pk)
+        while True:
+            if subscription.wait(STREAM_KEEPALIVE_SECONDS):
+                yield telemetry_event(drone_pk)
+            else:
+                yield ": keep-alive\n\n"
+
+
+async def atelemetry_event_stream(drone_pk):
+    render_event = sync_to_async(telemetry_event)
+    with telemetry_bus.subscribe(drone_pk) as subscription:
+        yield await render_event(drone_pk)
+        while True:
+            if await subscription.await_change(STREAM_KEEPALIVE_SECONDS):
+                yield await render_event(drone_pk)
+            else:
+                yield ": keep-alive\n\n"
+
+
+@login_required
+@role_required("ADMIN", "PILOT")
+def telemetry_stream(request, drone_id):
+    drone = get_object_or_404(Drone, id=drone_id)
+    if (
+        request.user.profile.role == Profile.Roles.PILOT
+        and not Shift.objects.filter(pilot=request.user, drone=drone)
+        .exclude(status=Shift.Status.CANCELLED)
+        .exists()
+    ):
+        return HttpResponseForbidden()
+
+    # Under ASGI an async iterator keeps idle streams off the worker threads. A WSGI stream
+    # pins a thread for its whole life, so by default the page is told to poll instead
+    # (204 stops EventSource from reconnecting).
+    if isinstance(request, ASGIRequest):
+        stream = atelemetry_event_stream(drone.pk)
+    elif settings.TELEMETRY_STREAM_SYNC:
+        stream = telemetry_event_stream(drone.pk)
+    else:
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 @login_required
@@ -299,18 +367,12 @@ def start_operation(request):
             shift.status = Shift.Status.ACTIVE
             shift.save(update_fields=["status"])
             Drone.objects.filter(id=shift.drone_id).update(status=Drone.Status.IN_USE)
-            payload = {
-                "session_id": session.id,
-                "route_name": shift.route.name,
-                "waypoints": shift.route.waypoints,
-                "zone_geojson": shift.route.zone_geojson,
-            }
             command = AgentCommand.objects.create(
                 drone=shift.drone,
                 created_by=request.user,
                 session=session,
                 command=AgentCommand.CommandType.START_MISSION,
-                payload=payload,
+                payload=mission_payload(session, shift.route),
             )
             log_event(request.user, "start_operation", "OperationSession", str(session.id), request)
             log_event(
@@ -371,6 +433,8 @@ def end_operation(request):
                 payload={"session_id": session.id},
             )
             log_event(request.user, "end_operation", "OperationSession", str(session.id), request)
+            if settings.TELEMETRY_ARCHIVE_ON_END:
+                transaction.on_commit(lambda: archive_session_in_background(session))
             log_event(
                 request.user,
                 "enqueue_command",
@@ -1,11 +1,9 @@
-import secrets
+from django.contrib import admin, messages
 
-from django.contrib import admin
-from django.utils.html import format_html
+from integrations.tokens import invalidate_drone_credentials
 
 from .models import Drone
-
-TOKEN_LENGTH = 64
+from .tokens import new_api_token
 
 
 @admin.register(Drone)
@@ -31,9 +29,10 @@ class DroneAdmin(admin.ModelAdmin):
             },
         ),
         ("Sistema", {"fields": ("firmware", "camera_type", "video_url")}),
-        ("API", {"fields": ("api_token",)}),
+        ("API", {"fields": ("api_token_display",)}),
     )
     readonly_fields = (
+        "api_token_display",
         "last_seen",
         "last_lat",
         "last_lng",
@@ -43,14 +42,20 @@ class DroneAdmin(admin.ModelAdmin):
         "last_heading",
     )
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_drone_credentials(obj.pk)
+
     @admin.display(description="API token")
     def api_token_display(self, obj):
-        if not obj.api_token:
-            return "-"
-        return format_html('<span style="font-family: monospace;">{}</span>', obj.api_token)
+        return "Configured" if obj.api_token_hash else "-"
 
     @admin.action(description="Generate API token")
     def generate_api_token(self, request, queryset):
         for drone in queryset:
-            drone.api_token = secrets.token_hex(TOKEN_LENGTH // 2)
-            drone.save(update_fields=["api_token"])
+            token = new_api_token()
+            drone.set_api_token(token)
+            drone.save(update_fields=["api_token_hash"])
+            invalidate_drone_credentials(drone.pk)
+            # Only the hash is stored, so this is the one chance to copy the token.
+            self.message_user(request, f"{drone.serial}: {token}", messages.SUCCESS)
@@ -1,18 +1,25 @@
-import secrets
-
 from django import forms
 
+from integrations.tokens import invalidate_drone_credentials
+
 from .models import Drone
+from .tokens import new_api_token
 
 
 class DroneForm(forms.ModelForm):
+    api_token = forms.CharField(
+        required=False,
+        max_length=128,
+        widget=forms.TextInput(attrs={"class": "form-control", "autocomplete": "off"}),
+        help_text="Solo se guarda el hash. Déjalo vacío para conservar el token actual.",
+    )
+
     class Meta:
         model = Drone
         fields = [
             "serial",
             "model",
             "status",
-            "api_token",
             "video_url",
             "last_seen",
             "last_lat",
@@ -22,15 +29,19 @@ class DroneForm(forms.ModelForm):
         ]
         widgets = {
             "last_seen": forms.DateTimeInput(attrs={"type": "datetime-local"}),
-            "api_token": forms.TextInput(attrs={"class": "form-control"}),
             "video_url": forms.URLInput(attrs={"class": "form-control"}),
         }
 
     def save(self, commit=True):
         instance = super().save(commit=False)
-        if not instance.api_token:
-            instance.api_token = secrets.token_urlsafe(32)
+        self.issued_token = self.cleaned_data.get("api_token")
+        if not self.issued_token and not instance.api_token_hash:
+            self.issued_token = new_api_token()
+        if self.issued_token:
+            instance.set_api_token(self.issued_token)
         if commit:
             instance.save()
             self.save_m2m()
+        if instance.pk:
+            invalidate_drone_credentials(instance.pk)
         return instance
@@ -0,0 +1,33 @@
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_existing_tokens(apps, schema_editor):
+    Drone = apps.get_model("fleet", "Drone")
+    drones = list(Drone.objects.exclude(api_token__isnull=True).exclude(api_token=""))
+    for drone in drones:
+        drone.api_token_hash = hashlib.sha256(drone.api_token.encode("utf-8")).hexdigest()
+    Drone.objects.bulk_update(drones, ["api_token_hash"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("fleet", "0003_drone_video_url"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="drone",
+            name="api_token_hash",
+            field=models.CharField(
+                blank=True, editable=False, max_length=64, null=True, unique=True
+            ),
+        ),
+        # Plaintext tokens cannot be recovered, so reversing leaves drones without a token.
+        migrations.RunPython(hash_existing_tokens, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="drone",
+            name="api_token",
+        ),
+    ]
@@ -1,5 +1,9 @@
+import hmac
+
 from django.db import models
 
+from .tokens import hash_api_token
+
 
 class Drone(models.Model):
     class Status(models.TextChoices):
@@ -11,7 +15,9 @@ class Drone(models.Model):
     serial = models.CharField(max_length=100, unique=True)
     model = models.CharField(max_length=100)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.AVAILABLE)
-    api_token = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    api_token_hash = models.CharField(
+        max_length=64, unique=True, null=True, blank=True, editable=False
+    )
     last_seen = models.DateTimeField(null=True, blank=True)
     last_lat = models.FloatField(null=True, blank=True)
     last_lng = models.FloatField(null=True, blank=True)
@@ -25,3 +31,11 @@ class Drone(models.Model):
 
     def __str__(self) -> str:
         return f"{self.serial} - {self.model}"
+
+    def set_api_token(self, token):
+        self.api_token_hash = hash_api_token(token) if token else None
+
+    def check_api_token(self, token):
+        if not self.api_token_hash or not token:
+            return False
+        return hmac.compare_digest(self.api_token_hash, hash_api_token(token))
@@ -0,0 +1,11 @@
+import hashlib
+import secrets
+
+
+def new_api_token():
+    return secrets.token_urlsafe(32)
+
+
+def hash_api_token(token):
+    # Tokens are random 256-bit secrets, so a fast unsalted digest keeps lookups indexable.
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
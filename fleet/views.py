@@ -1,6 +1,6 @@
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-import secrets
 
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
@@ -10,9 +10,26 @@ from django.views.generic import CreateView, DeleteView, ListView, UpdateView
 from accounts.decorators import role_required
 from accounts.mixins import RoleRequiredMixin
 from audit.utils import log_event
+from integrations.tokens import invalidate_drone_credentials
 
 from .forms import DroneForm
 from .models import Drone
+from .tokens import new_api_token
+
+
+def show_issued_token(request, drone, token):
+    messages.success(
+        request,
+        f"Token API de {drone.serial}: {token} — cópialo ahora, no se volverá a mostrar.",
+    )
+
+
+class IssuedTokenMixin:
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        if form.issued_token:
+            show_issued_token(self.request, self.object, form.issued_token)
+        return response
 
 
 class DroneListView(LoginRequiredMixin, RoleRequiredMixin, ListView):
@@ -22,7 +39,7 @@ class DroneListView(LoginRequiredMixin, RoleRequiredMixin, ListView):
     allowed_roles = ("ADMIN",)
 
 
-class DroneCreateView(LoginRequiredMixin, RoleRequiredMixin, CreateView):
+class DroneCreateView(LoginRequiredMixin, RoleRequiredMixin, IssuedTokenMixin, CreateView):
     model = Drone
     form_class = DroneForm
     template_name = "fleet/drone_form.html"
@@ -30,7 +47,7 @@ class DroneCreateView(LoginRequiredMixin, RoleRequiredMixin, CreateView):
     allowed_roles = ("ADMIN",)
 
 
-class DroneUpdateView(LoginRequiredMixin, RoleRequiredMixin, UpdateView):
+class DroneUpdateView(LoginRequiredMixin, RoleRequiredMixin, IssuedTokenMixin, UpdateView):
     model = Drone
     form_class = DroneForm
     template_name = "fleet/drone_form.html"
@@ -44,6 +61,12 @@ class DroneDeleteView(LoginRequiredMixin, RoleRequiredMixin, DeleteView):
     success_url = reverse_lazy("admin-drone-list")
     allowed_roles = ("ADMIN",)
 
+    def form_valid(self, form):
+        drone_pk = self.object.pk
+        response = super().form_valid(form)
+        invalidate_drone_credentials(drone_pk)
+        return response
+
 
 @login_required
 @role_required("ADMIN")
@@ -63,7 +86,10 @@ def mark_drone_status(request, drone_id, status):
 @require_POST
 def regenerate_drone_token(request, drone_id):
     drone = get_object_or_404(Drone, id=drone_id)
-    drone.api_token = secrets.token_urlsafe(32)
-    drone.save(update_fields=["api_token"])
+    token = new_api_token()
+    drone.set_api_token(token)
+    drone.save(update_fields=["api_token_hash"])
+    invalidate_drone_credentials(drone.pk)
+    show_issued_token(request, drone, token)
     log_event(request.user, "regenerate_drone_token", "Drone", str(drone.id), request, {})
     return redirect("admin-drone-update", pk=drone.id)
@@ -0,0 +1,65 @@
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from fleet.models import Drone
+
+from .command_archive import command_history
+from .models import AgentCommand, ArchivedAgentCommand
+
+HISTORY_PER_PAGE = 100
+
+
+@admin.register(AgentCommand)
+class AgentCommandAdmin(admin.ModelAdmin):
+    list_display = ("id", "drone", "command", "status", "attempts", "created_at", "acked_at")
+    list_filter = ("status", "command")
+    search_fields = ("id", "drone__serial")
+
+    def get_urls(self):
+        history = self.admin_site.admin_view(self.history_view)
+        return [
+            path("history/", history, name="integrations_agentcommand_history"),
+        ] + super().get_urls()
+
+    def history_view(self, request):
+        # Hot and archived commands merged newest first, read through command_history().
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        serial = request.GET.get("drone")
+        drone = Drone.objects.filter(serial=serial).first() if serial else None
+        try:
+            number = max(int(request.GET.get("page", 1)), 1)
+        except ValueError:
+            number = 1
+        commands = []
+        if drone or not serial:
+            commands = command_history(drone, limit=number * HISTORY_PER_PAGE)
+        rows = [
+            (command, isinstance(command, ArchivedAgentCommand))
+            for command in commands[(number - 1) * HISTORY_PER_PAGE :]
+        ]
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Agent command history",
+            "rows": rows,
+            "drone": drone,
+            "page": number,
+            "has_next": len(commands) == number * HISTORY_PER_PAGE,
+        }
+        return TemplateResponse(request, "admin/integrations/agentcommand/history.html", context)
+
+
+@admin.register(ArchivedAgentCommand)
+class ArchivedAgentCommandAdmin(admin.ModelAdmin):
+    list_display = ("id", "drone", "command", "status", "attempts", "created_at", "acked_at")
+    list_filter = ("status", "command")
+    search_fields = ("id", "drone__serial")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
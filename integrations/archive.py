@@ -0,0 +1,203 @@
+import json
+import logging
+import mmap
+import os
+import shutil
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from integrations.buffer import state_buffer
+from integrations.models import TelemetryArchive, TelemetrySample
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_VERSION = 1
+WRITE_CHUNK = 10000
+INT_MISSING = -1
+
+# Column name -> (TelemetrySample field, array typecode, value for missing data)
+COLUMNS = {
+    "ts": ("recorded_at", "d", None),
+    "lat": ("lat", "d", float("nan")),
+    "lng": ("lng", "d", float("nan")),
+    "alt": ("alt", "f", float("nan")),
+    "battery": ("battery", "i", INT_MISSING),
+    "signal": ("signal", "i", INT_MISSING),
+    "heading": ("heading", "i", INT_MISSING),
+}
+
+
+def archive_root():
+    return Path(
+        getattr(settings, "TELEMETRY_ARCHIVE_ROOT", settings.BASE_DIR / "telemetry_archive")
+    )
+
+
+def archive_path(session_id):
+    return archive_root() / f"session_{session_id}"
+
+
+def _flush_columns(buffers, handles):
+    for name, values in buffers.items():
+        values.tofile(handles[name])
+        del values[:]
+
+
+def archive_session(session):
+    state_buffer.flush()
+    final_path = archive_path(session.id)
+    tmp_path = final_path.with_name(final_path.name + ".tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+
+    fields = [field for field, _, _ in COLUMNS.values()]
+    rows = (
+        TelemetrySample.objects.filter(session=session)
+        .order_by("recorded_at", "id")
+        .values_list(*fields)
+        .iterator(chunk_size=WRITE_CHUNK)
+    )
+    value_columns = [(name, missing) for name, (_, _, missing) in COLUMNS.items()][1:]
+    buffers = {name: array(typecode) for name, (_, typecode, _) in COLUMNS.items()}
+    handles = {name: open(tmp_path / f"{name}.bin", "wb") for name in COLUMNS}
+    count = 0
+    first = last = None
+    try:
+        for row in rows:
+            recorded_at = row[0]
+            first = first or recorded_at
+            last = recorded_at
+            buffers["ts"].append(recorded_at.timestamp())
+            for (name, missing), value in zip(value_columns, row[1:]):
+                buffers[name].append(missing if value is None else value)
+            count += 1
+            if count % WRITE_CHUNK == 0:
+                _flush_columns(buffers, handles)
+        _flush_columns(buffers, handles)
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+    meta = {
+        "version": ARCHIVE_VERSION,
+        "session_id": session.id,
+        "drone_id": session.shift.drone_id,
+        "count": count,
+        "byteorder": sys.byteorder,
+        "columns": {name: typecode for name, (_, typecode, _) in COLUMNS.items()},
+        "int_missing": INT_MISSING,
+    }
+    (tmp_path / "meta.json").write_text(json.dumps(meta))
+    shutil.rmtree(final_path, ignore_errors=True)
+    os.replace(tmp_path, final_path)
+
+    archive, _ = TelemetryArchive.objects.update_or_create(
+        session=session,
+        defaults={
+            "sample_count": count,
+            "first_recorded_at": first,
+            "last_recorded_at": last,
+        },
+    )
+    return archive
+
+
+def archive_delay():
+    # Other workers' write-behind buffers only reach the database on their next flush.
+    delay = getattr(settings, "TELEMETRY_ARCHIVE_DELAY", None)
+    if delay is None:
+        delay = 2 * getattr(settings, "TELEMETRY_FLUSH_INTERVAL_MS", 500) / 1000 + 1
+    return delay
+
+
+def archive_session_in_background(session):
+    def run():
+        try:
+            time.sleep(archive_delay())
+            archive_session(session)
+        except Exception:
+            logger.exception("Could not archive telemetry for session %s", session.id)
+        finally:
+            close_old_connections()
+
+    threading.Thread(target=run, name=f"archive-session-{session.id}", daemon=True).start()
+
+
+class SessionArchive:
+    def __init__(self, session_id):
+        self.path = archive_path(session_id)
+        self.meta = json.loads((self.path / "meta.json").read_text())
+        if self.meta["byteorder"] != sys.byteorder:
+            raise ValueError(
+                f"Archive {self.path} was written on a {self.meta['byteorder']}-endian host"
+            )
+        self._maps = {}
+        self._views = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.meta["count"]
+
+    def column(self, name):
+        if name not in self._views:
+            typecode = self.meta["columns"][name]
+            if not len(self):
+                self._views[name] = memoryview(array(typecode))
+                return self._views[name]
+            with open(self.path / f"{name}.bin", "rb") as handle:
+                mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[name] = mapped
+            self._views[name] = memoryview(mapped).cast(typecode)
+        return self._views[name]
+
+    def columns(self):
+        return {name: self.column(name) for name in self.meta["columns"]}
+
+    def index_range(self, start=None, end=None):
+        timestamps = self.column("ts")
+        lo = 0 if start is None else bisect_left(timestamps, _as_epoch(start))
+        hi = len(timestamps) if end is None else bisect_left(timestamps, _as_epoch(end))
+        return lo, hi
+
+    def slice(self, start=None, end=None):
+        lo, hi = self.index_range(start, end)
+        return {name: view[lo:hi] for name, view in self.columns().items()}
+
+    def close(self):
+        # Slices or arrays built on a column may outlive the archive; a map they still pin
+        # is left to be unmapped by garbage collection once the last of them goes away.
+        for release in [
+            *(view.release for view in self._views.values()),
+            *(mapped.close for mapped in self._maps.values()),
+        ]:
+            try:
+                release()
+            except BufferError:
+                continue
+        self._views.clear()
+        self._maps.clear()
+
+
+def _as_epoch(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=dt_timezone.utc)
+        return value.timestamp()
+    return float(value)
+
+
+def open_archive(session_id):
+    return SessionArchive(session_id)
@@ -0,0 +1,175 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.utils import OperationalError, ProgrammingError
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+
+from audit.utils import log_event
+from fleet.models import Drone
+from integrations.buffer import save_telemetry, state_buffer
+from integrations.bus import command_bus
+from integrations.sequencing import sequence_guard
+from integrations.signing import is_signed
+from integrations.telemetry import arunning_session_ids
+from integrations.tokens import signing_keys
+from integrations.views import (
+    MAX_BATCH_ACKS,
+    accept_telemetry,
+    ack_response,
+    apply_acks,
+    apply_registration,
+    cache_bearer_drone,
+    cached_bearer_drone,
+    claim_commands,
+    command_response,
+    drone_matches,
+    json_error,
+    matched_drone,
+    parse_acks,
+    parse_json_body,
+    parse_max,
+    parse_wait,
+    registration_event,
+    registration_payload,
+    registration_response,
+    resolve_telemetry,
+    signed_drone,
+    telemetry_writes,
+    throttled,
+)
+
+alog_event = sync_to_async(log_event)
+aapply_acks = sync_to_async(transaction.atomic(apply_acks))
+
+
+async def authenticate_drone(request, drone_id=None):
+    if is_signed(request):
+        if signing_keys.stale():
+            try:
+                await sync_to_async(signing_keys.refresh)()
+            except (OperationalError, ProgrammingError):
+                return None, json_error("service_unavailable", status=503)
+        return signed_drone(request, drone_id)
+
+    token, token_hash, drone, error = cached_bearer_drone(request)
+    if error:
+        return None, error
+    if drone is None:
+        try:
+            drone = await Drone.objects.filter(api_token_hash=token_hash).afirst()
+        except (OperationalError, ProgrammingError):
+            return None, json_error("service_unavailable", status=503)
+        drone = cache_bearer_drone(drone, token)
+    return matched_drone(drone, drone_id)
+
+
+async def authorize_drone(request, endpoint, drone_id=None):
+    error = throttled(endpoint)
+    if error:
+        return None, error
+
+    drone, error = await authenticate_drone(request, drone_id)
+    if error:
+        return None, error
+
+    error = throttled(endpoint, drone)
+    return (None, error) if error else (drone, None)
+
+
+@csrf_exempt
+async def register_agent(request):
+    if request.method != "POST":
+        return json_error("method_not_allowed", status=405)
+
+    drone, error = await authorize_drone(request, "register", request.GET.get("drone_id"))
+    if error:
+        return error
+
+    payload, error = registration_payload(request, drone)
+    if error:
+        return error
+
+    await drone.asave(update_fields=apply_registration(drone, payload))
+    sequence_guard.reset(drone.pk)
+    await alog_event(**registration_event(request, drone, payload))
+    return registration_response(request, drone)
+
+
+@csrf_exempt
+async def telemetry(request):
+    if request.method != "POST":
+        return json_error("method_not_allowed", status=405)
+
+    drone, error = await authorize_drone(request, "telemetry", request.GET.get("drone_id"))
+    if error:
+        return error
+
+    samples, changed, dropped, response = resolve_telemetry(request, drone)
+    if response:
+        return response
+
+    try:
+        session_id = (await arunning_session_ids([drone.pk])).get(drone.pk)
+        writes = telemetry_writes(drone, samples, session_id, timezone.now(), changed)
+        if state_buffer.enabled:
+            save_telemetry(*writes)
+        else:
+            await sync_to_async(save_telemetry)(*writes)
+    except (OperationalError, ProgrammingError):
+        return json_error("service_unavailable", status=503)
+    return accept_telemetry(drone, samples, dropped)
+
+
+@csrf_exempt
+async def pull_commands(request):
+    if request.method != "GET":
+        return json_error("method_not_allowed", status=405)
+
+    drone, error = await authorize_drone(request, "commands", request.GET.get("drone_id"))
+    if error:
+        return error
+
+    # select_for_update needs a transaction, which the async ORM cannot open.
+    claim = sync_to_async(claim_commands)
+    limit = parse_max(request.GET.get("max"))
+    try:
+        with command_bus.subscribe(drone.pk) as subscription:
+            commands = await claim(drone, limit)
+            deadline = time.monotonic() + parse_wait(request)
+            while not commands:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not await subscription.await_change(remaining):
+                    break
+                commands = await claim(drone, limit)
+    except (OperationalError, ProgrammingError):
+        commands = []
+
+    return command_response(commands)
+
+
+@csrf_exempt
+async def ack_command(request):
+    if request.method != "POST":
+        return json_error("method_not_allowed", status=405)
+
+    drone, error = await authorize_drone(request, "ack", request.GET.get("drone_id"))
+    if error:
+        return error
+
+    payload = parse_json_body(request)
+    if not isinstance(payload, (dict, list)):
+        return json_error("invalid_json", status=400)
+    if isinstance(payload, dict) and not drone_matches(drone, payload.get("drone_id")):
+        return json_error("invalid_token", status=401)
+    acks, batch = parse_acks(payload)
+    if len(acks) > MAX_BATCH_ACKS:
+        return json_error("batch_too_large", status=413)
+
+    try:
+        results = await aapply_acks(drone, acks, request)
+    except (OperationalError, ProgrammingError):
+        return json_error("service_unavailable", status=503)
+
+    return ack_response(results, batch)
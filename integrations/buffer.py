@@ -0,0 +1,165 @@
+import atexit
+import logging
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, transaction
+
+from fleet.models import Drone
+from integrations.models import TelemetrySample
+from integrations.bus import telemetry_bus
+
+logger = logging.getLogger(__name__)
+
+INSERT_BATCH_SIZE = 500
+
+
+def write_drone_states(states, rows):
+    # Drones sharing the same set of changed fields go out in one bulk_update.
+    groups = {}
+    for drone_pk, update_fields in states.items():
+        fields = tuple(sorted(update_fields))
+        groups.setdefault(fields, []).append(Drone(pk=drone_pk, **update_fields))
+    for fields, drones in groups.items():
+        Drone.objects.bulk_update(drones, fields)
+    if rows:
+        TelemetrySample.objects.bulk_create(rows, batch_size=INSERT_BATCH_SIZE)
+
+
+class DroneStateBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = {}
+        self._rows = []
+        self._stopped = threading.Event()
+        self._worker = None
+
+    @property
+    def enabled(self):
+        # Without a positive interval nothing would ever flush, so writes stay synchronous.
+        return getattr(settings, "TELEMETRY_WRITE_BEHIND", False) and self.interval > 0
+
+    @property
+    def interval(self):
+        return getattr(settings, "TELEMETRY_FLUSH_INTERVAL_MS", 500) / 1000
+
+    def record(self, states, rows=()):
+        with self._lock:
+            for drone_pk, update_fields in states.items():
+                self._states.setdefault(drone_pk, {}).update(update_fields)
+            self._rows.extend(rows)
+        self._ensure_worker()
+
+    def pending_state(self, drone_pk):
+        with self._lock:
+            return dict(self._states.get(drone_pk, {}))
+
+    def overlay(self, drone):
+        if drone is not None:
+            for field, value in self.pending_state(drone.pk).items():
+                setattr(drone, field, value)
+        return drone
+
+    def flush(self):
+        with self._lock:
+            states, self._states = self._states, {}
+            rows, self._rows = self._rows, []
+        if not states and not rows:
+            return 0
+
+        try:
+            drone_pks = {row.drone_id for row in rows} | set(states)
+            existing = set(Drone.objects.filter(pk__in=drone_pks).values_list("pk", flat=True))
+            states = {pk: fields for pk, fields in states.items() if pk in existing}
+            rows = [row for row in rows if row.drone_id in existing]
+            with transaction.atomic():
+                write_drone_states(states, rows)
+        except OperationalError:
+            self._requeue(states, rows)
+            raise
+        except Exception:
+            # A value the database refuses must not hold back every other drone's writes.
+            logger.exception("Buffered telemetry flush failed, retrying drone by drone")
+            return self._flush_each(states, rows)
+        # Subscribers re-read the database, so they hear about buffered state only once it is there.
+        telemetry_bus.publish(list(states))
+        return len(states)
+
+    def _flush_each(self, states, rows):
+        written = []
+        drone_pks = list(dict.fromkeys([*states, *(row.drone_id for row in rows)]))
+        try:
+            for index, drone_pk in enumerate(drone_pks):
+                drone_states = {drone_pk: states[drone_pk]} if drone_pk in states else {}
+                drone_rows = [row for row in rows if row.drone_id == drone_pk]
+                try:
+                    with transaction.atomic():
+                        write_drone_states(drone_states, drone_rows)
+                except OperationalError:
+                    remaining = set(drone_pks[index:])
+                    self._requeue(
+                        {pk: fields for pk, fields in states.items() if pk in remaining},
+                        [row for row in rows if row.drone_id in remaining],
+                    )
+                    raise
+                except Exception:
+                    logger.exception(
+                        "Dropping buffered telemetry for drone %s (%d samples)",
+                        drone_pk,
+                        len(drone_rows),
+                    )
+                    continue
+                written.extend(drone_states)
+        finally:
+            telemetry_bus.publish(written)
+        return len(written)
+
+    def close(self):
+        self._stopped.set()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Could not flush buffered drone state on shutdown")
+
+    def _requeue(self, states, rows):
+        with self._lock:
+            for drone_pk, update_fields in states.items():
+                merged = dict(update_fields)
+                merged.update(self._states.get(drone_pk, {}))
+                self._states[drone_pk] = merged
+            self._rows[:0] = rows
+
+    def _ensure_worker(self):
+        if not self.enabled or self._stopped.is_set():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self._run, name="drone-state-buffer", daemon=True
+            )
+            self._worker.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Could not flush buffered drone state")
+            finally:
+                close_old_connections()
+
+
+state_buffer = DroneStateBuffer()
+atexit.register(state_buffer.close)
+
+
+def save_telemetry(states, rows):
+    if state_buffer.enabled:
+        # Published by the flush that makes the state visible.
+        state_buffer.record(states, rows)
+    else:
+        with transaction.atomic():
+            write_drone_states(states, rows)
+        transaction.on_commit(partial(telemetry_bus.publish, list(states)))
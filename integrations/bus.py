@@ -0,0 +1,195 @@
+import atexit
+import os
+import socket
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+from integrations.streams import DroneEventHub
+
+MAX_DATAGRAM = 4096
+
+
+def datagrams(drone_pks):
+    # Comma-separated pks, split so that no datagram exceeds MAX_DATAGRAM bytes.
+    payloads, current = [], b""
+    for drone_pk in drone_pks:
+        value = str(drone_pk).encode("ascii")
+        if current and len(current) + 1 + len(value) > MAX_DATAGRAM:
+            payloads.append(current)
+            current = b""
+        current = current + b"," + value if current else value
+    if current:
+        payloads.append(current)
+    return payloads
+
+
+class InProcessBus:
+    def __init__(self):
+        self.hub = DroneEventHub()
+
+    def publish(self, drone_pks):
+        self.hub.publish(drone_pks)
+
+    def subscribe(self, drone_pk):
+        return self.hub.subscribe(drone_pk)
+
+    def listen(self, callback):
+        self.hub.listen(callback)
+
+    def version(self, drone_pk):
+        return self.hub.version(drone_pk)
+
+    def close(self):
+        pass
+
+
+class SocketBus:
+    # Every subscribing process binds a datagram socket in a shared directory; publishers
+    # notify their own hub and send the drone ids to every other socket found there.
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.hub = DroneEventHub()
+        self._lock = threading.Lock()
+        self._listener = None
+        self._path = None
+        self._pid = None
+        self._sender = None
+        self._sender_pid = None
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                return
+            # A forked worker must not reuse the socket inherited from its parent.
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._pid = os.getpid()
+            self._path = self.directory / f"{self._pid}-{uuid.uuid4().hex[:8]}.sock"
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            listener.bind(str(self._path))
+            self._listener = listener
+            threading.Thread(
+                target=self._listen,
+                args=(listener,),
+                name=f"{self.directory.name}-bus",
+                daemon=True,
+            ).start()
+            atexit.register(self.close)
+
+    def _listen(self, listener):
+        while True:
+            try:
+                data = listener.recv(MAX_DATAGRAM)
+            except OSError:
+                return
+            try:
+                drone_pks = [int(value) for value in data.split(b",") if value]
+            except ValueError:
+                continue
+            self.hub.publish(drone_pks)
+
+    def publish(self, drone_pks):
+        self.hub.publish(drone_pks)
+        payloads = datagrams(drone_pks)
+        if not payloads:
+            return
+        pid = os.getpid()
+        with self._lock:
+            if self._sender is None or self._sender_pid != pid:
+                self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                self._sender.setblocking(False)
+                self._sender_pid = pid
+            sender = self._sender
+            own_path = self._path if self._pid == pid else None
+        for path in self.directory.glob("*.sock"):
+            if path == own_path:
+                continue
+            try:
+                for payload in payloads:
+                    sender.sendto(payload, str(path))
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The worker that bound this socket is gone.
+                path.unlink(missing_ok=True)
+            except OSError:
+                # A full receive buffer drops the wake-up; waiting pulls still time out.
+                continue
+
+    def subscribe(self, drone_pk):
+        self._ensure_listener()
+        return self.hub.subscribe(drone_pk)
+
+    def listen(self, callback):
+        self._ensure_listener()
+        self.hub.listen(callback)
+
+    def version(self, drone_pk):
+        return self.hub.version(drone_pk)
+
+    def close(self):
+        with self._lock:
+            if self._listener is not None:
+                self._listener.close()
+                self._listener = None
+                if self._path is not None:
+                    self._path.unlink(missing_ok=True)
+            if self._sender is not None:
+                self._sender.close()
+                self._sender = None
+
+
+def build_bus(channel):
+    backend = getattr(settings, "AGENT_COMMAND_BUS", "inprocess")
+    if backend == "socket":
+        directory = getattr(settings, "AGENT_COMMAND_BUS_DIR", None)
+        directory = Path(directory or Path(tempfile.gettempdir()) / "dronex-bus")
+        return SocketBus(directory / channel)
+    if backend == "inprocess":
+        return InProcessBus()
+    raise ValueError(f"Unknown AGENT_COMMAND_BUS backend {backend!r}")
+
+
+class EventBus:
+    def __init__(self, channel):
+        self.channel = channel
+        self._lock = threading.Lock()
+        self._backend = None
+        self._listeners = []
+
+    @property
+    def backend(self):
+        with self._lock:
+            if self._backend is None:
+                self._backend = build_bus(self.channel)
+                # Listeners outlive reset(); a rebuilt backend picks them up again.
+                for callback in self._listeners:
+                    self._backend.listen(callback)
+            return self._backend
+
+    def publish(self, drone_pks):
+        self.backend.publish(drone_pks)
+
+    def subscribe(self, drone_pk):
+        return self.backend.subscribe(drone_pk)
+
+    def listen(self, callback):
+        backend = self.backend
+        with self._lock:
+            self._listeners.append(callback)
+        backend.listen(callback)
+
+    def version(self, drone_pk):
+        return self.backend.version(drone_pk)
+
+    def reset(self):
+        with self._lock:
+            if self._backend is not None:
+                self._backend.close()
+            self._backend = None
+
+
+command_bus = EventBus("commands")
+telemetry_bus = EventBus("telemetry")
+credentials_bus = EventBus("credentials")
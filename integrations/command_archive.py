@@ -0,0 +1,71 @@
+from datetime import timedelta
+from heapq import merge
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from integrations.models import AgentCommand, ArchivedAgentCommand
+
+ARCHIVE_STATUSES = (AgentCommand.Status.ACKED, AgentCommand.Status.FAILED)
+ARCHIVE_FIELDS = [
+    "id",
+    "drone_id",
+    "created_by_id",
+    "session_id",
+    "command",
+    "payload",
+    "status",
+    "created_at",
+    "sent_at",
+    "acked_at",
+    "result",
+    "attempts",
+]
+
+
+def archive_cutoff(now=None, days=None):
+    if days is None:
+        days = getattr(settings, "AGENT_COMMAND_ARCHIVE_AFTER_DAYS", 7)
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def archive_commands(batch_size=1000, days=None, now=None):
+    cutoff = archive_cutoff(now, days)
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                AgentCommand.objects.select_for_update()
+                .filter(status__in=ARCHIVE_STATUSES, created_at__lt=cutoff)
+                .order_by("id")
+                .values(*ARCHIVE_FIELDS)[:batch_size]
+            )
+            if rows:
+                ArchivedAgentCommand.objects.bulk_create(
+                    [ArchivedAgentCommand(**row) for row in rows], ignore_conflicts=True
+                )
+                AgentCommand.objects.filter(id__in=[row["id"] for row in rows]).delete()
+        moved += len(rows)
+        if len(rows) < batch_size:
+            return moved
+
+
+def command_history(drone=None, limit=1):
+    # Newest first across both tables (all drones when drone is None). When the hot table
+    # fills the page, the archive is only probed for rows at least as new as the last one.
+    hot = AgentCommand.objects.select_related("drone")
+    cold = ArchivedAgentCommand.objects.select_related("drone")
+    if drone is not None:
+        hot, cold = hot.filter(drone=drone), cold.filter(drone=drone)
+    hot = list(hot.order_by("-created_at", "-id")[:limit])
+    if len(hot) == limit:
+        cold = cold.filter(created_at__gte=hot[-1].created_at)
+    cold = cold.order_by("-created_at", "-id")[:limit]
+    commands = merge(hot, cold, key=lambda command: command.created_at, reverse=True)
+    return list(commands)[:limit]
+
+
+def latest_command(drone):
+    commands = command_history(drone, limit=1)
+    return commands[0] if commands else None
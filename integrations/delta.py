@@ -0,0 +1,84 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from integrations.telemetry import SAMPLE_FIELDS, parse_seq
+
+DELTA_MODE = "delta"
+STATE_KEYS = ("ts", *SAMPLE_FIELDS, "status")
+
+
+class ResyncRequired(Exception):
+    def __init__(self, ack_seq):
+        super().__init__(ack_seq)
+        self.ack_seq = ack_seq
+
+
+class DeltaTracker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = OrderedDict()
+
+    @property
+    def max_entries(self):
+        return getattr(settings, "TELEMETRY_DELTA_CACHE_SIZE", 10000)
+
+    def ack_seq(self, drone_pk):
+        with self._lock:
+            entry = self._states.get(drone_pk)
+            return entry[0] if entry else None
+
+    def forget(self, drone_pk):
+        with self._lock:
+            self._states.pop(drone_pk, None)
+
+    def resolve(self, drone_pk, samples):
+        # Returns full samples plus the fields a delta-only request changed (None otherwise).
+        # An empty list (everything dropped as a retry, or an ack-only heartbeat) says
+        # nothing about the agent's state, so the acknowledged base is kept.
+        if not samples:
+            return samples, None
+        if not any(
+            sample.get("mode") == DELTA_MODE or parse_seq(sample.get("seq")) is not None
+            for sample in samples
+        ):
+            self.forget(drone_pk)
+            return samples, None
+
+        with self._lock:
+            entry = self._states.get(drone_pk)
+            full_samples = []
+            changed = set()
+            only_deltas = True
+            for sample in samples:
+                seq = parse_seq(sample.get("seq"))
+                if sample.get("mode") == DELTA_MODE:
+                    base_seq = parse_seq(sample.get("base_seq"))
+                    if entry is None or seq is None or base_seq != entry[0]:
+                        raise ResyncRequired(entry[0] if entry else None)
+                    delta = {key: sample[key] for key in STATE_KEYS if key in sample}
+                    changed.update(delta)
+                    # Timestamps and link status belong to one sample and are never carried over.
+                    state = {**entry[1], "ts": None, "status": None, **delta}
+                else:
+                    only_deltas = False
+                    state = sample
+                full_samples.append(state)
+                # A full sample without a sequence number leaves nothing to diff against.
+                if seq is None:
+                    entry = None
+                else:
+                    entry = (seq, {key: state.get(key) for key in STATE_KEYS})
+
+            if entry is None:
+                self._states.pop(drone_pk, None)
+            else:
+                self._states[drone_pk] = entry
+                self._states.move_to_end(drone_pk)
+                while len(self._states) > self.max_entries:
+                    self._states.popitem(last=False)
+        return full_samples, (changed if only_deltas else None)
+
+
+delta_tracker = DeltaTracker()
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, ProgrammingError
+
+from integrations.command_archive import archive_commands
+
+
+class Command(BaseCommand):
+    help = "Move ACKED and FAILED agent commands older than the archive age to the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--days", type=float, help="Defaults to settings.AGENT_COMMAND_ARCHIVE_AFTER_DAYS."
+        )
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep archiving every --interval seconds."
+        )
+        parser.add_argument("--interval", type=float, default=3600.0)
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                moved = archive_commands(batch_size=options["batch_size"], days=options["days"])
+            except (OperationalError, ProgrammingError) as exc:
+                self.stderr.write(
+                    self.style.ERROR(
+                        f"Cannot archive commands before migrations are applied: {exc}"
+                    )
+                )
+                return
+
+            if not options["loop"] or moved:
+                self.stdout.write(self.style.SUCCESS(f"Commands archived: {moved}."))
+            if not options["loop"]:
+                return
+            try:
+                time.sleep(options["interval"])
+            except KeyboardInterrupt:
+                return
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, ProgrammingError
+from django.db.models import Count, F, Q
+
+from integrations.archive import archive_session
+from ops.models import OperationSession
+
+
+class Command(BaseCommand):
+    help = (
+        "Freeze telemetry of ended operation sessions into columnar archives. Archives that "
+        "gained samples after they were written (late write-behind flushes) are rebuilt."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--session", type=int, action="append", dest="sessions")
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rebuild archives that already exist.",
+        )
+
+    def handle(self, *args, **options):
+        sessions = OperationSession.objects.filter(status=OperationSession.Status.ENDED)
+        if options["sessions"]:
+            sessions = sessions.filter(id__in=options["sessions"])
+        if not options["force"]:
+            # A count mismatch means samples landed after the archive was frozen.
+            sessions = sessions.annotate(samples=Count("telemetry_samples")).filter(
+                Q(telemetry_archive__isnull=True)
+                | ~Q(samples=F("telemetry_archive__sample_count"))
+            )
+
+        archived = 0
+        try:
+            for session in sessions.select_related("shift").order_by("ended_at"):
+                archive = archive_session(session)
+                archived += 1
+                self.stdout.write(f"Session {session.id}: {archive.sample_count} samples")
+        except (OperationalError, ProgrammingError) as exc:
+            self.stderr.write(
+                self.style.ERROR(f"Cannot archive telemetry before migrations are applied: {exc}")
+            )
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"Telemetry archives written: {archived}."))
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+async def post_telemetry(url, token, client_delay, timeout):
+    parts = urlsplit(url)
+    target = f"{parts.path}?{parts.query}" if parts.query else parts.path
+    # The bearer token identifies the drone, so one body works for every token.
+    body = json.dumps({"lat": 4.6, "lng": -74.1, "battery": 90}).encode()
+    head = (
+        f"POST {target} HTTP/1.1\r\n"
+        f"Host: {parts.netloc}\r\n"
+        f"Authorization: Bearer {token}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode()
+
+    started = time.perf_counter()
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(parts.hostname, parts.port or 80), timeout
+    )
+    try:
+        writer.write(head)
+        await writer.drain()
+        # A slow uplink keeps the connection open while the body trickles in.
+        if client_delay:
+            await asyncio.sleep(client_delay)
+        writer.write(body)
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+    finally:
+        writer.close()
+    status = int(status_line.split()[1]) if status_line else 0
+    return status, time.perf_counter() - started
+
+
+async def run_level(url, tokens, concurrency, client_delay, timeout):
+    async def one(token):
+        try:
+            return await post_telemetry(url, token, client_delay, timeout)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+            return 0, None
+
+    started = time.perf_counter()
+    # Connections are spread round-robin so each drone's rate-limit bucket sees a fair share.
+    results = await asyncio.gather(
+        *(one(tokens[index % len(tokens)]) for index in range(concurrency))
+    )
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latency for status, latency in results if status == 200)
+    limited = sum(1 for status, _ in results if status == 429)
+    return {
+        "ok": len(latencies),
+        "limited": limited,
+        "failed": concurrency - len(latencies) - limited,
+        "elapsed": elapsed,
+        "p50": statistics.median(latencies) if latencies else None,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] if latencies else None,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Open many concurrent slow agent connections against telemetry endpoints "
+        "to compare WSGI and ASGI capacity. Agent endpoints are rate limited per drone, "
+        "so pass one --token per drone (enough that concurrency / tokens stays under the "
+        "telemetry burst) or run the server with AGENT_RATE_LIMIT_ENABLED=0. Rate-limited "
+        "answers are reported in their own 429 column, not as failures."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            action="append",
+            required=True,
+            help="NAME=URL of a telemetry endpoint, e.g. "
+            "wsgi=http://127.0.0.1:8000/api/agent/telemetry/ or "
+            "asgi=http://127.0.0.1:8001/api/agent/async/telemetry/",
+        )
+        parser.add_argument(
+            "--token",
+            action="append",
+            required=True,
+            help="Bearer token of a drone; repeat to spread connections across drones.",
+        )
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 500, 1000])
+        parser.add_argument("--client-delay", type=float, default=0.5)
+        parser.add_argument("--timeout", type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options["target"]:
+            name, sep, url = target.partition("=")
+            if not sep or not url.startswith("http://"):
+                raise CommandError(f"Invalid target {target!r}, expected NAME=http://...")
+            targets.append((name, url))
+
+        self.stdout.write(
+            f"{'target':<10}{'conns':>7}{'ok':>7}{'429':>7}{'failed':>8}"
+            f"{'req/s':>9}{'p50':>9}{'p95':>9}"
+        )
+        for concurrency in options["concurrency"]:
+            for name, url in targets:
+                result = asyncio.run(
+                    run_level(
+                        url,
+                        options["token"],
+                        concurrency,
+                        options["client_delay"],
+                        options["timeout"],
+                    )
+                )
+                p50 = f"{result['p50']:.3f}" if result["p50"] is not None else "-"
+                p95 = f"{result['p95']:.3f}" if result["p95"] is not None else "-"
+                self.stdout.write(
+                    f"{name:<10}{concurrency:>7}{result['ok']:>7}{result['limited']:>7}"
+                    f"{result['failed']:>8}"
+                    f"{result['ok'] / result['elapsed']:>9.1f}{p50:>9}{p95:>9}"
+                )
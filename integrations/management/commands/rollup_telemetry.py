@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, ProgrammingError
+
+from integrations.rollups import run_rollups
+
+
+class Command(BaseCommand):
+    help = "Aggregate new telemetry samples into per-minute and per-hour rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=50000)
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Ignore the stored watermark and recompute rollups from all raw samples.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            processed = run_rollups(chunk_size=options["chunk_size"], rebuild=options["rebuild"])
+        except (OperationalError, ProgrammingError) as exc:
+            self.stderr.write(
+                self.style.ERROR(f"Cannot build rollups before migrations are applied: {exc}")
+            )
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Telemetry rollups updated. Samples processed: {processed}.")
+        )
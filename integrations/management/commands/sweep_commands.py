@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, ProgrammingError
+
+from integrations.sweeper import sweep_stale_commands
+
+
+class Command(BaseCommand):
+    help = "Re-queue or fail agent commands that were sent but never acknowledged."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep sweeping every --interval seconds."
+        )
+        parser.add_argument("--interval", type=float, default=15.0)
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                requeued, failed = sweep_stale_commands(batch_size=options["batch_size"])
+            except (OperationalError, ProgrammingError) as exc:
+                self.stderr.write(
+                    self.style.ERROR(f"Cannot sweep commands before migrations are applied: {exc}")
+                )
+                return
+
+            if not options["loop"] or requeued or failed:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Stale commands swept. Re-queued: {requeued}. Failed: {failed}."
+                    )
+                )
+            if not options["loop"]:
+                return
+            try:
+                time.sleep(options["interval"])
+            except KeyboardInterrupt:
+                return
@@ -0,0 +1,24 @@
+import threading
+from collections import Counter, defaultdict
+
+
+class IngestMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(Counter)
+
+    def increment(self, drone_pk, name, amount=1):
+        if amount:
+            with self._lock:
+                self._counters[drone_pk][name] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return {drone_pk: dict(counter) for drone_pk, counter in self._counters.items()}
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+
+
+ingest_metrics = IngestMetrics()
@@ -0,0 +1,52 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fleet", "0003_drone_video_url"),
+        ("integrations", "0001_initial"),
+        ("ops", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TelemetrySample",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("recorded_at", models.DateTimeField()),
+                ("received_at", models.DateTimeField()),
+                ("lat", models.FloatField(blank=True, null=True)),
+                ("lng", models.FloatField(blank=True, null=True)),
+                ("alt", models.FloatField(blank=True, null=True)),
+                ("battery", models.IntegerField(blank=True, null=True)),
+                ("signal", models.IntegerField(blank=True, null=True)),
+                ("heading", models.IntegerField(blank=True, null=True)),
+                (
+                    "drone",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="telemetry_samples",
+                        to="fleet.drone",
+                    ),
+                ),
+                (
+                    "session",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="telemetry_samples",
+                        to="ops.operationsession",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["drone", "recorded_at"], name="telemetry_drone_time_idx"),
+                    models.Index(fields=["session", "recorded_at"], name="telemetry_session_time_idx"),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fleet", "0003_drone_video_url"),
+        ("integrations", "0002_telemetrysample"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RollupWatermark",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("last_sample_id", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="TelemetryRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "resolution",
+                    models.CharField(
+                        choices=[("MINUTE", "1 minute"), ("HOUR", "1 hour")], max_length=10
+                    ),
+                ),
+                ("bucket_start", models.DateTimeField()),
+                ("sample_count", models.PositiveIntegerField(default=0)),
+                ("min_alt", models.FloatField(blank=True, null=True)),
+                ("max_alt", models.FloatField(blank=True, null=True)),
+                ("avg_alt", models.FloatField(blank=True, null=True)),
+                ("min_battery", models.IntegerField(blank=True, null=True)),
+                ("max_battery", models.IntegerField(blank=True, null=True)),
+                ("avg_battery", models.FloatField(blank=True, null=True)),
+                ("min_signal", models.IntegerField(blank=True, null=True)),
+                ("max_signal", models.IntegerField(blank=True, null=True)),
+                ("avg_signal", models.FloatField(blank=True, null=True)),
+                ("min_lat", models.FloatField(blank=True, null=True)),
+                ("max_lat", models.FloatField(blank=True, null=True)),
+                ("min_lng", models.FloatField(blank=True, null=True)),
+                ("max_lng", models.FloatField(blank=True, null=True)),
+                (
+                    "drone",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="telemetry_rollups",
+                        to="fleet.drone",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="telemetryrollup",
+            constraint=models.UniqueConstraint(
+                fields=("drone", "resolution", "bucket_start"), name="telemetry_rollup_bucket_uniq"
+            ),
+        ),
+    ]
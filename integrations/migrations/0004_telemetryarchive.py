@@ -0,0 +1,39 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("integrations", "0003_telemetryrollup"),
+        ("ops", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TelemetryArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sample_count", models.PositiveIntegerField(default=0)),
+                ("first_recorded_at", models.DateTimeField(blank=True, null=True)),
+                ("last_recorded_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now=True)),
+                (
+                    "session",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="telemetry_archive",
+                        to="ops.operationsession",
+                    ),
+                ),
+            ],
+        ),
+    ]
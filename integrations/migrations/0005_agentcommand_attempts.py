@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("integrations", "0004_telemetryarchive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="agentcommand",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="agentcommand",
+            index=models.Index(fields=["status", "sent_at"], name="agent_command_status_sent_idx"),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_metric_counts(apps, schema_editor):
+    # Raw per-metric counts are unknown for existing rows; sample_count is the old weighting.
+    # "manage.py rollup_telemetry --rebuild" recomputes them exactly from raw samples.
+    TelemetryRollup = apps.get_model("integrations", "TelemetryRollup")
+    for metric in ("alt", "battery", "signal"):
+        TelemetryRollup.objects.filter(**{f"avg_{metric}__isnull": False}).update(
+            **{f"count_{metric}": F("sample_count")}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("integrations", "0007_archivedagentcommand"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="telemetryrollup",
+            name="count_alt",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="telemetryrollup",
+            name="count_battery",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="telemetryrollup",
+            name="count_signal",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_metric_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations, models
+
+COLUMNS = (
+    "id, drone_id, created_by_id, session_id, command, payload, status, "
+    "created_at, sent_at, acked_at, result, attempts"
+)
+CREATE_VIEW = f"""
+CREATE VIEW integrations_agentcommand_history AS
+SELECT {COLUMNS}, FALSE AS archived FROM integrations_agentcommand
+UNION ALL
+SELECT {COLUMNS}, TRUE AS archived FROM integrations_archivedagentcommand
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("integrations", "0008_telemetryrollup_metric_counts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AgentCommandHistory",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                (
+                    "command",
+                    models.CharField(
+                        choices=[
+                            ("START_MISSION", "Start Mission"),
+                            ("END_MISSION", "End Mission"),
+                            ("RETURN_HOME", "Return Home"),
+                            ("PING", "Ping"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                ("payload", models.JSONField(blank=True, default=dict)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("SENT", "Sent"),
+                            ("ACKED", "Acked"),
+                            ("FAILED", "Failed"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("created_at", models.DateTimeField()),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                ("acked_at", models.DateTimeField(blank=True, null=True)),
+                ("result", models.JSONField(blank=True, default=dict)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("archived", models.BooleanField(default=False)),
+            ],
+            options={
+                "verbose_name_plural": "agent command history",
+                "db_table": "integrations_agentcommand_history",
+                "managed": False,
+            },
+        ),
+        migrations.RunSQL(CREATE_VIEW, "DROP VIEW integrations_agentcommand_history"),
+    ]
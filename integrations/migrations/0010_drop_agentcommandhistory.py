@@ -0,0 +1,28 @@
+from django.db import migrations
+
+# The UNION ALL view from 0009 broke SQLite table rebuilds of either command table, so the
+# history is now merged in Python (integrations.command_archive.command_history).
+COLUMNS = (
+    "id, drone_id, created_by_id, session_id, command, payload, status, "
+    "created_at, sent_at, acked_at, result, attempts"
+)
+CREATE_VIEW = f"""
+CREATE VIEW integrations_agentcommand_history AS
+SELECT {COLUMNS}, FALSE AS archived FROM integrations_agentcommand
+UNION ALL
+SELECT {COLUMNS}, TRUE AS archived FROM integrations_archivedagentcommand
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("integrations", "0009_agentcommandhistory"),
+    ]
+
+    operations = [
+        migrations.RunSQL("DROP VIEW IF EXISTS integrations_agentcommand_history", CREATE_VIEW),
+        migrations.DeleteModel(
+            name="AgentCommandHistory",
+        ),
+    ]
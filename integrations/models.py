@@ -1,7 +1,10 @@
+from functools import partial
+
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 
 from fleet.models import Drone
+from integrations.bus import command_bus
 from ops.models import OperationSession
 
 
@@ -30,6 +33,184 @@ class AgentCommand(models.Model):
     sent_at = models.DateTimeField(null=True, blank=True)
     acked_at = models.DateTimeField(null=True, blank=True)
     result = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "sent_at"], name="agent_command_status_sent_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.drone.serial} - {self.command} ({self.status})"
+
+    def save(self, *args, **kwargs):
+        created = self._state.adding
+        super().save(*args, **kwargs)
+        if created:
+            # Wake long-polling agents once the command is visible to their transaction.
+            transaction.on_commit(partial(command_bus.publish, [self.drone_id]))
+
+
+class ArchivedAgentCommand(models.Model):
+    # Same columns and ids as AgentCommand; rows land here once they are ACKED/FAILED and old.
+    id = models.BigIntegerField(primary_key=True)
+    drone = models.ForeignKey(Drone, on_delete=models.CASCADE, related_name="+")
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    session = models.ForeignKey(
+        OperationSession, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    command = models.CharField(max_length=30, choices=AgentCommand.CommandType.choices)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=AgentCommand.Status.choices)
+    created_at = models.DateTimeField()
+    sent_at = models.DateTimeField(null=True, blank=True)
+    acked_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["drone", "created_at"], name="archived_command_drone_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.drone.serial} - {self.command} ({self.status}, archived)"
+
+
+class RouteGeometry(models.Model):
+    digest = models.CharField(max_length=64, primary_key=True)
+    geometry = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"Route geometry {self.digest[:12]}"
+
+
+class TelemetrySampleQuerySet(models.QuerySet):
+    def for_drone(self, drone):
+        return self.filter(drone=drone)
+
+    def between(self, start=None, end=None):
+        queryset = self
+        if start is not None:
+            queryset = queryset.filter(recorded_at__gte=start)
+        if end is not None:
+            queryset = queryset.filter(recorded_at__lt=end)
+        return queryset.order_by("recorded_at", "id")
+
+
+class TelemetrySample(models.Model):
+    drone = models.ForeignKey(Drone, on_delete=models.CASCADE, related_name="telemetry_samples")
+    session = models.ForeignKey(
+        OperationSession,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="telemetry_samples",
+    )
+    recorded_at = models.DateTimeField()
+    received_at = models.DateTimeField()
+    lat = models.FloatField(null=True, blank=True)
+    lng = models.FloatField(null=True, blank=True)
+    alt = models.FloatField(null=True, blank=True)
+    battery = models.IntegerField(null=True, blank=True)
+    signal = models.IntegerField(null=True, blank=True)
+    heading = models.IntegerField(null=True, blank=True)
+
+    objects = TelemetrySampleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["drone", "recorded_at"], name="telemetry_drone_time_idx"),
+            models.Index(fields=["session", "recorded_at"], name="telemetry_session_time_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.drone_id} @ {self.recorded_at:%Y-%m-%d %H:%M:%S}"
+
+
+class TelemetryRollupQuerySet(models.QuerySet):
+    def for_drone(self, drone):
+        return self.filter(drone=drone)
+
+    def minutes(self):
+        return self.filter(resolution=TelemetryRollup.Resolution.MINUTE)
+
+    def hours(self):
+        return self.filter(resolution=TelemetryRollup.Resolution.HOUR)
+
+    def between(self, start=None, end=None):
+        queryset = self
+        if start is not None:
+            queryset = queryset.filter(bucket_start__gte=start)
+        if end is not None:
+            queryset = queryset.filter(bucket_start__lt=end)
+        return queryset.order_by("bucket_start")
+
+
+class TelemetryRollup(models.Model):
+    class Resolution(models.TextChoices):
+        MINUTE = "MINUTE", "1 minute"
+        HOUR = "HOUR", "1 hour"
+
+    drone = models.ForeignKey(Drone, on_delete=models.CASCADE, related_name="telemetry_rollups")
+    resolution = models.CharField(max_length=10, choices=Resolution.choices)
+    bucket_start = models.DateTimeField()
+    sample_count = models.PositiveIntegerField(default=0)
+    min_alt = models.FloatField(null=True, blank=True)
+    max_alt = models.FloatField(null=True, blank=True)
+    avg_alt = models.FloatField(null=True, blank=True)
+    min_battery = models.IntegerField(null=True, blank=True)
+    max_battery = models.IntegerField(null=True, blank=True)
+    avg_battery = models.FloatField(null=True, blank=True)
+    min_signal = models.IntegerField(null=True, blank=True)
+    max_signal = models.IntegerField(null=True, blank=True)
+    avg_signal = models.FloatField(null=True, blank=True)
+    count_alt = models.PositiveIntegerField(default=0)
+    count_battery = models.PositiveIntegerField(default=0)
+    count_signal = models.PositiveIntegerField(default=0)
+    min_lat = models.FloatField(null=True, blank=True)
+    max_lat = models.FloatField(null=True, blank=True)
+    min_lng = models.FloatField(null=True, blank=True)
+    max_lng = models.FloatField(null=True, blank=True)
+
+    objects = TelemetryRollupQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["drone", "resolution", "bucket_start"], name="telemetry_rollup_bucket_uniq"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.drone_id} {self.resolution} @ {self.bucket_start:%Y-%m-%d %H:%M}"
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    last_sample_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.name} -> {self.last_sample_id}"
+
+
+class TelemetryArchive(models.Model):
+    session = models.OneToOneField(
+        OperationSession, on_delete=models.CASCADE, related_name="telemetry_archive"
+    )
+    sample_count = models.PositiveIntegerField(default=0)
+    first_recorded_at = models.DateTimeField(null=True, blank=True)
+    last_recorded_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"Archive session {self.session_id} ({self.sample_count} samples)"
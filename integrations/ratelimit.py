@@ -0,0 +1,71 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+
+from integrations.metrics import ingest_metrics
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst, now):
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, rate, burst, now):
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+
+class AgentRateLimiter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    @property
+    def enabled(self):
+        return getattr(settings, "AGENT_RATE_LIMIT_ENABLED", False)
+
+    def limit(self, endpoint, scope):
+        return getattr(settings, "AGENT_RATE_LIMITS", {}).get(endpoint, {}).get(scope)
+
+    def report_interval(self, endpoint):
+        limit = self.limit(endpoint, "drone")
+        return round(1 / limit[0], 3) if limit else None
+
+    def check(self, endpoint, drone_pk=None):
+        # Returns 0 when the request may proceed, otherwise the seconds until it would.
+        if not self.enabled:
+            return 0.0
+        scope = "global" if drone_pk is None else "drone"
+        limit = self.limit(endpoint, scope)
+        if not limit:
+            return 0.0
+        rate, burst = limit
+        key = (endpoint, drone_pk)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(burst, now)
+            retry_after = bucket.take(rate, burst, now)
+        if retry_after and drone_pk is not None:
+            ingest_metrics.increment(drone_pk, "rate_limited")
+        return retry_after
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+def retry_after_header(retry_after):
+    return str(max(1, math.ceil(retry_after)))
+
+
+agent_limiter = AgentRateLimiter()
@@ -0,0 +1,159 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Max, Min, Q, Sum
+from django.db.models.functions import TruncHour, TruncMinute
+
+from integrations.models import RollupWatermark, TelemetryRollup, TelemetrySample
+
+WATERMARK_NAME = "telemetry_rollup"
+# Sparse buckets are recomputed in batches so the OR-ed range filter stays small.
+RANGES_PER_QUERY = 100
+METRICS = ("alt", "battery", "signal")
+POSITION_FIELDS = ("lat", "lng")
+ROLLUP_FIELDS = [
+    "sample_count",
+    *[f"{prefix}_{metric}" for metric in METRICS for prefix in ("min", "max", "avg", "count")],
+    *[f"{prefix}_{field}" for field in POSITION_FIELDS for prefix in ("min", "max")],
+]
+
+
+def floor_hour(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def upsert_rollups(rollups):
+    TelemetryRollup.objects.bulk_create(
+        rollups,
+        update_conflicts=True,
+        unique_fields=["drone", "resolution", "bucket_start"],
+        update_fields=ROLLUP_FIELDS,
+    )
+
+
+def minute_aggregates():
+    aggregates = {"agg_sample_count": Count("id")}
+    for metric in METRICS:
+        aggregates[f"agg_min_{metric}"] = Min(metric)
+        aggregates[f"agg_max_{metric}"] = Max(metric)
+        aggregates[f"agg_sum_{metric}"] = Sum(metric, output_field=FloatField())
+        aggregates[f"agg_count_{metric}"] = Count(metric)
+    for field in POSITION_FIELDS:
+        aggregates[f"agg_min_{field}"] = Min(field)
+        aggregates[f"agg_max_{field}"] = Max(field)
+    return aggregates
+
+
+def hour_aggregates():
+    # Minute averages are weighted by how many samples in each minute carried the metric.
+    aggregates = {"agg_sample_count": Sum("sample_count")}
+    for metric in METRICS:
+        aggregates[f"agg_min_{metric}"] = Min(f"min_{metric}")
+        aggregates[f"agg_max_{metric}"] = Max(f"max_{metric}")
+        aggregates[f"agg_sum_{metric}"] = Sum(
+            F(f"avg_{metric}") * F(f"count_{metric}"), output_field=FloatField()
+        )
+        aggregates[f"agg_count_{metric}"] = Sum(f"count_{metric}")
+    for field in POSITION_FIELDS:
+        aggregates[f"agg_min_{field}"] = Min(f"min_{field}")
+        aggregates[f"agg_max_{field}"] = Max(f"max_{field}")
+    return aggregates
+
+
+def build_rollup(drone_id, resolution, row):
+    values = {field: row[f"agg_{field}"] for field in ROLLUP_FIELDS if not field.startswith("avg_")}
+    for metric in METRICS:
+        count = row[f"agg_count_{metric}"]
+        values[f"avg_{metric}"] = row[f"agg_sum_{metric}"] / count if count else None
+    return TelemetryRollup(
+        drone_id=drone_id, resolution=resolution, bucket_start=row["bucket"], **values
+    )
+
+
+def bucket_ranges(buckets, step):
+    # Consecutive buckets collapse into one [start, end) range so the query stays on the index.
+    ranges = []
+    for bucket in sorted(buckets):
+        if ranges and ranges[-1][1] == bucket:
+            ranges[-1][1] = bucket + step
+        else:
+            ranges.append([bucket, bucket + step])
+    return ranges
+
+
+def ranges_filter(field, ranges):
+    condition = Q()
+    for start, end in ranges:
+        condition |= Q(**{f"{field}__gte": start, f"{field}__lt": end})
+    return condition
+
+
+def rollup_drone_buckets(drone_id, minute_buckets):
+    minute_ranges = bucket_ranges(minute_buckets, timedelta(minutes=1))
+    for index in range(0, len(minute_ranges), RANGES_PER_QUERY):
+        minutes = (
+            TelemetrySample.objects.filter(drone_id=drone_id)
+            .filter(ranges_filter("recorded_at", minute_ranges[index : index + RANGES_PER_QUERY]))
+            .annotate(bucket=TruncMinute("recorded_at"))
+            .values("bucket")
+            .annotate(**minute_aggregates())
+            .order_by("bucket")
+        )
+        upsert_rollups(
+            [build_rollup(drone_id, TelemetryRollup.Resolution.MINUTE, row) for row in minutes]
+        )
+
+    hour_ranges = bucket_ranges(
+        {floor_hour(bucket) for bucket in minute_buckets}, timedelta(hours=1)
+    )
+    for index in range(0, len(hour_ranges), RANGES_PER_QUERY):
+        hours = (
+            TelemetryRollup.objects.minutes()
+            .filter(drone_id=drone_id)
+            .filter(ranges_filter("bucket_start", hour_ranges[index : index + RANGES_PER_QUERY]))
+            .annotate(bucket=TruncHour("bucket_start"))
+            .values("bucket")
+            .annotate(**hour_aggregates())
+            .order_by("bucket")
+        )
+        upsert_rollups(
+            [build_rollup(drone_id, TelemetryRollup.Resolution.HOUR, row) for row in hours]
+        )
+
+
+def run_rollups(chunk_size=50000, rebuild=False):
+    watermark, _ = RollupWatermark.objects.get_or_create(name=WATERMARK_NAME)
+    if rebuild:
+        watermark.last_sample_id = 0
+    processed = 0
+    while True:
+        # Samples are picked up by insertion id, so late arrivals still land in their buckets.
+        ids = TelemetrySample.objects.filter(id__gt=watermark.last_sample_id).order_by("id")
+        upper = list(ids.values_list("id", flat=True)[chunk_size - 1 : chunk_size])
+        upper_id = upper[0] if upper else None
+        chunk = ids if upper_id is None else ids.filter(id__lte=upper_id)
+        # Only the minutes the new samples fall into are recomputed, however far apart they are.
+        touched = (
+            chunk.order_by()
+            .annotate(bucket=TruncMinute("recorded_at"))
+            .values("drone_id", "bucket")
+            .annotate(last_id=Max("id"), samples=Count("id"))
+        )
+        buckets = {}
+        last_id = samples = 0
+        for row in touched:
+            buckets.setdefault(row["drone_id"], set()).add(row["bucket"])
+            last_id = max(last_id, row["last_id"])
+            samples += row["samples"]
+        if not buckets:
+            break
+
+        with transaction.atomic():
+            for drone_id, minute_buckets in buckets.items():
+                rollup_drone_buckets(drone_id, minute_buckets)
+            watermark.last_sample_id = last_id
+            watermark.save(update_fields=["last_sample_id", "updated_at"])
+        processed += samples
+        if upper_id is None:
+            break
+    return processed
@@ -0,0 +1,32 @@
+import hashlib
+import json
+
+from django.urls import reverse
+
+from integrations.models import RouteGeometry
+
+
+def canonical_geometry(geometry):
+    return json.dumps(geometry, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def geometry_digest(geometry):
+    return hashlib.sha256(canonical_geometry(geometry)).hexdigest()
+
+
+def store_route_geometry(route):
+    geometry = {"waypoints": route.waypoints, "zone_geojson": route.zone_geojson}
+    digest = geometry_digest(geometry)
+    RouteGeometry.objects.get_or_create(digest=digest, defaults={"geometry": geometry})
+    return digest
+
+
+def mission_payload(session, route):
+    # START_MISSION carries only the geometry hash; agents fetch the body once per version.
+    digest = store_route_geometry(route)
+    return {
+        "session_id": session.id,
+        "route_name": route.name,
+        "route_hash": digest,
+        "route_url": reverse("agent-route-geometry", args=[digest]),
+    }
@@ -0,0 +1,71 @@
+import threading
+
+from integrations.metrics import ingest_metrics
+from integrations.telemetry import parse_sample_timestamp, parse_seq
+
+
+class SequenceGuard:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._marks = {}
+
+    def clear(self):
+        with self._lock:
+            self._marks.clear()
+
+    def reset(self, drone_pk):
+        with self._lock:
+            self._marks.pop(drone_pk, None)
+
+    def filter(self, drone_pk, samples):
+        # Samples are compared with the high-water mark of what was already applied, so an
+        # out-of-order batch is kept whole while replays and late stragglers are dropped.
+        with self._lock:
+            seq_mark, ts_mark = self._marks.get(drone_pk, (None, None))
+        fresh = []
+        seen = set()
+        duplicates = stale = 0
+        for sample in samples:
+            seq = parse_seq(sample.get("seq"))
+            if seq is not None:
+                if seq in seen or seq == seq_mark:
+                    duplicates += 1
+                    continue
+                if seq_mark is not None and seq < seq_mark:
+                    stale += 1
+                    continue
+                seen.add(seq)
+            elif ts_mark is not None:
+                ts = parse_sample_timestamp(sample.get("ts"))
+                if ts is not None and ts <= ts_mark:
+                    if ts == ts_mark:
+                        duplicates += 1
+                    else:
+                        stale += 1
+                    continue
+            fresh.append(sample)
+
+        ingest_metrics.increment(drone_pk, "samples_duplicate", duplicates)
+        ingest_metrics.increment(drone_pk, "samples_stale", stale)
+        return fresh, duplicates + stale
+
+    def advance(self, drone_pk, samples):
+        # Called once samples are stored, so a failed write can be retried with the same seq.
+        seqs = [
+            seq for seq in (parse_seq(sample.get("seq")) for sample in samples) if seq is not None
+        ]
+        timestamps = [
+            ts for ts in (parse_sample_timestamp(sample.get("ts")) for sample in samples) if ts
+        ]
+        with self._lock:
+            seq_mark, ts_mark = self._marks.get(drone_pk, (None, None))
+            if seqs:
+                seq_mark = max(seqs) if seq_mark is None else max(seq_mark, *seqs)
+            if timestamps:
+                ts_mark = max(timestamps) if ts_mark is None else max(ts_mark, *timestamps)
+            if seq_mark is not None or ts_mark is not None:
+                self._marks[drone_pk] = (seq_mark, ts_mark)
+        ingest_metrics.increment(drone_pk, "samples_accepted", len(samples))
+
+
+sequence_guard = SequenceGuard()
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+
+class Subscription:
+    def __init__(self, hub, drone_pk):
+        self.hub = hub
+        self.drone_pk = drone_pk
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        self._event = asyncio.Event() if self._loop else threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def notify(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._event.set)
+        else:
+            self._event.set()
+
+    def wait(self, timeout):
+        changed = self._event.wait(timeout)
+        self._event.clear()
+        return changed
+
+    async def await_change(self, timeout):
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._event.clear()
+        return True
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class DroneEventHub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = defaultdict(int)
+        self._subscribers = defaultdict(set)
+        self._listeners = []
+
+    def version(self, drone_pk):
+        with self._lock:
+            return self._versions[drone_pk]
+
+    def publish(self, drone_pks):
+        with self._lock:
+            subscribers = []
+            for drone_pk in drone_pks:
+                self._versions[drone_pk] += 1
+                subscribers.extend(self._subscribers.get(drone_pk, ()))
+            listeners = list(self._listeners)
+        for subscription in subscribers:
+            subscription.notify()
+        for listener in listeners:
+            listener(drone_pks)
+
+    def listen(self, callback):
+        # callback(drone_pks) runs on every publish, whichever drones it names.
+        with self._lock:
+            self._listeners.append(callback)
+
+    def subscribe(self, drone_pk):
+        subscription = Subscription(self, drone_pk)
+        with self._lock:
+            self._subscribers[drone_pk].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.drone_pk)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.drone_pk]
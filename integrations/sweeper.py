@@ -0,0 +1,71 @@
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from audit.utils import log_events
+from integrations.bus import command_bus
+from integrations.models import AgentCommand
+
+DEFAULT_POLICY = {"timeout": 120, "max_attempts": 1}
+
+
+def command_policy(command_type):
+    policies = getattr(settings, "AGENT_COMMAND_POLICIES", {})
+    return {**DEFAULT_POLICY, **policies.get(command_type, {})}
+
+
+def sweep_command_type(command_type, now, batch_size):
+    policy = command_policy(command_type)
+    cutoff = now - timedelta(seconds=policy["timeout"])
+    requeued = failed = 0
+    while True:
+        with transaction.atomic():
+            stale = list(
+                AgentCommand.objects.select_for_update()
+                .filter(status=AgentCommand.Status.SENT, sent_at__lt=cutoff, command=command_type)
+                .order_by("sent_at")
+                .values_list("id", "drone_id", "attempts")[:batch_size]
+            )
+            retry = [row for row in stale if row[2] < policy["max_attempts"]]
+            give_up = [row for row in stale if row[2] >= policy["max_attempts"]]
+            if retry:
+                AgentCommand.objects.filter(id__in=[row[0] for row in retry]).update(
+                    status=AgentCommand.Status.PENDING, sent_at=None
+                )
+                log_events(
+                    None,
+                    "command_requeue",
+                    "AgentCommand",
+                    [(row[0], {"command": command_type, "attempts": row[2]}) for row in retry],
+                )
+                transaction.on_commit(
+                    partial(command_bus.publish, sorted({row[1] for row in retry}))
+                )
+            if give_up:
+                AgentCommand.objects.filter(id__in=[row[0] for row in give_up]).update(
+                    status=AgentCommand.Status.FAILED,
+                    result={"error": "ack_timeout", "attempts": policy["max_attempts"]},
+                )
+                log_events(
+                    None,
+                    "command_timeout",
+                    "AgentCommand",
+                    [(row[0], {"command": command_type, "attempts": row[2]}) for row in give_up],
+                )
+        requeued += len(retry)
+        failed += len(give_up)
+        if len(stale) < batch_size:
+            return requeued, failed
+
+
+def sweep_stale_commands(batch_size=1000, now=None):
+    now = now or timezone.now()
+    requeued = failed = 0
+    for command_type in AgentCommand.CommandType.values:
+        type_requeued, type_failed = sweep_command_type(command_type, now, batch_size)
+        requeued += type_requeued
+        failed += type_failed
+    return requeued, failed
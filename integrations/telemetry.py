@@ -0,0 +1,172 @@
+import json
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from fleet.models import Drone
+from integrations.models import TelemetrySample
+from integrations.wire import PackedSample
+from ops.models import OperationSession
+
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/ndjson"}
+LOST_LINK_STATUSES = {"LOST_LINK", "NO_SIGNAL"}
+MAX_BATCH_SAMPLES = 1000
+MAX_GATEWAY_DRONES = 500
+
+FLOAT_SAMPLE_FIELDS = {"lat", "lng", "alt"}
+INT_FIELD_MIN, INT_FIELD_MAX = -(2**31), 2**31 - 1
+
+SAMPLE_FIELDS = {
+    "lat": "last_lat",
+    "lng": "last_lng",
+    "alt": "last_alt",
+    "battery": "last_battery",
+    "signal": "last_signal",
+    "heading": "last_heading",
+}
+
+
+def is_sample_list(samples):
+    return isinstance(samples, list) and all(
+        isinstance(sample, (dict, PackedSample)) for sample in samples
+    )
+
+
+def coerce_sample_value(key, value):
+    # Raises ValueError for anything the Float/Integer telemetry columns would reject.
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{key} must be a number")
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{key} must be finite")
+    if key in FLOAT_SAMPLE_FIELDS:
+        return number
+    number = round(number)
+    if not INT_FIELD_MIN <= number <= INT_FIELD_MAX:
+        raise ValueError(f"{key} is out of range")
+    return number
+
+
+def clean_samples(samples):
+    # Returns the samples with numeric fields coerced, or None if any of them is invalid.
+    if not is_sample_list(samples):
+        return None
+    cleaned = []
+    try:
+        for sample in samples:
+            if isinstance(sample, dict):
+                sample = {
+                    **sample,
+                    **{
+                        key: coerce_sample_value(key, sample[key])
+                        for key in SAMPLE_FIELDS
+                        if key in sample
+                    },
+                }
+            cleaned.append(sample)
+    except ValueError:
+        return None
+    return cleaned
+
+
+def parse_ndjson_body(body):
+    samples = []
+    try:
+        for line in body.decode("utf-8").splitlines():
+            line = line.strip()
+            if line:
+                samples.append(json.loads(line))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    return samples
+
+
+def parse_sample_timestamp(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        try:
+            return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            return None
+    if isinstance(value, str):
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            return None
+        if parsed and timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed, dt_timezone.utc)
+        return parsed
+    return None
+
+
+def parse_seq(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        return None
+    return value
+
+
+def latest_sample(samples):
+    # Agent sequence numbers decide first; samples without a timestamp are treated as the
+    # newest at their arrival position.
+    latest = None
+    latest_seq = latest_ts = None
+    for sample in samples:
+        seq = parse_seq(sample.get("seq"))
+        ts = parse_sample_timestamp(sample.get("ts"))
+        if seq is not None and latest_seq is not None:
+            newer = seq >= latest_seq
+        else:
+            newer = latest is None or ts is None or latest_ts is None or ts >= latest_ts
+        if newer:
+            latest = sample
+            latest_seq = seq
+            latest_ts = ts
+    return latest
+
+
+def build_drone_update(sample, seen_at, keys=None):
+    update_fields = {
+        field: sample.get(key)
+        for key, field in SAMPLE_FIELDS.items()
+        if keys is None or key in keys
+    }
+    update_fields["last_seen"] = seen_at
+    if sample.get("status") in LOST_LINK_STATUSES:
+        update_fields["status"] = Drone.Status.LOST_LINK
+    return update_fields
+
+
+def running_sessions(drone_ids):
+    return OperationSession.objects.filter(
+        shift__drone_id__in=drone_ids, status=OperationSession.Status.RUNNING
+    ).values_list("shift__drone_id", "id")
+
+
+def running_session_ids(drone_ids):
+    return dict(running_sessions(drone_ids))
+
+
+async def arunning_session_ids(drone_ids):
+    return {drone_pk: session_id async for drone_pk, session_id in running_sessions(drone_ids)}
+
+
+def build_sample_rows(drone, samples, session_id, received_at):
+    rows = []
+    for sample in samples:
+        rows.append(
+            TelemetrySample(
+                drone=drone,
+                session_id=session_id,
+                recorded_at=parse_sample_timestamp(sample.get("ts")) or received_at,
+                received_at=received_at,
+                **{key: sample.get(key) for key in SAMPLE_FIELDS},
+            )
+        )
+    return rows
@@ -0,0 +1,818 @@
+import asyncio
+import hashlib
+import io
+import json
+import math
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import AsyncClient, Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from audit.models import AuditLog
+from fleet.models import Drone
+from fleet.tokens import hash_api_token
+from integrations.archive import archive_session, open_archive
+from integrations.buffer import state_buffer
+from integrations.bus import SocketBus, credentials_bus, telemetry_bus
+from integrations.command_archive import archive_commands, command_history
+from integrations.metrics import ingest_metrics
+from integrations.models import (
+    AgentCommand,
+    ArchivedAgentCommand,
+    RouteGeometry,
+    TelemetryRollup,
+    TelemetrySample,
+)
+from integrations.ratelimit import agent_limiter
+from integrations.rollups import run_rollups
+from integrations.routes import store_route_geometry
+from integrations.sequencing import sequence_guard
+from integrations.sweeper import sweep_stale_commands
+from integrations.signing import replay_cache, sign_request
+from integrations.tokens import drone_tokens, signing_keys
+from integrations.wire import BINARY_CONTENT_TYPE, encode_gateway, encode_samples
+from ops.models import OperationSession, Route, Shift
+
+
+@override_settings(TELEMETRY_WRITE_BEHIND=False)
+class AgentTelemetryTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.drone = Drone.objects.create(
+            serial="DRX-T01", model="Falcon", api_token_hash=hash_api_token("tok-t01")
+        )
+        self.auth = {"HTTP_AUTHORIZATION": "Bearer tok-t01"}
+        sequence_guard.clear()
+        ingest_metrics.clear()
+        drone_tokens.clear()
+        signing_keys.invalidate()
+        agent_limiter.clear()
+        replay_cache.clear()
+
+    def post_json(self, url, payload, **extra):
+        return self.client.post(
+            url, data=json.dumps(payload), content_type="application/json", **self.auth, **extra
+        )
+
+    def test_single_sample(self):
+        response = self.post_json(
+            reverse("agent-telemetry"), {"drone_id": "DRX-T01", "lat": 4.6, "battery": 80}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.drone.refresh_from_db()
+        self.assertEqual(self.drone.last_lat, 4.6)
+        self.assertEqual(self.drone.last_battery, 80)
+
+    def test_non_numeric_fields_are_rejected_or_coerced(self):
+        url = reverse("agent-telemetry")
+        self.assertEqual(self.post_json(url, {"lat": "abc"}).status_code, 400)
+        response = self.post_json(url, {"samples": [{"lat": 1}, {"lat": {"x": 1}}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.post_json(url, {"battery": 2**40}).status_code, 400)
+
+        response = self.post_json(url, {"lat": "4.5", "battery": 80.0})
+        self.assertEqual(response.status_code, 200)
+        self.drone.refresh_from_db()
+        self.assertEqual((self.drone.last_lat, self.drone.last_battery), (4.5, 80))
+
+    def test_batch_applies_newest_sample(self):
+        response = self.post_json(
+            reverse("agent-telemetry"),
+            {
+                "drone_id": "DRX-T01",
+                "samples": [
+                    {"ts": "2024-01-01T10:00:02Z", "lat": 2.0},
+                    {"ts": "2024-01-01T10:00:01Z", "lat": 1.0},
+                ],
+            },
+        )
+        self.assertEqual(response.json()["accepted"], 2)
+        self.drone.refresh_from_db()
+        self.assertEqual(self.drone.last_lat, 2.0)
+        history = TelemetrySample.objects.for_drone(self.drone).between()
+        self.assertEqual([sample.lat for sample in history], [1.0, 2.0])
+        latest = history.last().recorded_at
+        self.assertEqual(list(history.between(start=latest)), [history.last()])
+
+    def test_ndjson_batch(self):
+        body = '{"ts": 1704103200, "lat": 1.0}\n{"ts": 1704103201, "lat": 3.0}\n'
+        response = self.client.post(
+            reverse("agent-telemetry") + "?drone_id=DRX-T01",
+            data=body,
+            content_type="application/x-ndjson",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.drone.refresh_from_db()
+        self.assertEqual(self.drone.last_lat, 3.0)
+
+    def test_binary_frame(self):
+        body = encode_samples(
+            [
+                {"ts": 1704103200, "lat": 1.0, "battery": 70},
+                {"ts": 1704103201, "lat": 4.25, "alt": 12.5, "heading": 270},
+            ]
+        )
+        response = self.client.post(
+            reverse("agent-telemetry") + "?drone_id=DRX-T01",
+            data=body,
+            content_type=BINARY_CONTENT_TYPE,
+            **self.auth,
+        )
+        self.assertEqual(response.json()["accepted"], 2)
+        self.drone.refresh_from_db()
+        self.assertEqual(self.drone.last_lat, 4.25)
+        self.assertEqual(self.drone.last_heading, 270)
+        self.assertIsNone(self.drone.last_battery)
+
+        for invalid in (body[:-3], encode_samples([{"lat": math.inf, "alt": -math.inf}])):
+            response = self.client.post(
+                reverse("agent-telemetry") + "?drone_id=DRX-T01",
+                data=invalid,
+                content_type=BINARY_CONTENT_TYPE,
+                **self.auth,
+            )
+            self.assertEqual(response.json()["error"], "invalid_frame")
+        self.drone.refresh_from_db()
+        self.assertEqual(self.drone.last_lat, 4.25)
+
+    def test_binary_gateway_frame(self):
+        body = encode_gateway(
+            [{"drone_id": "DRX-T01", "token": "tok-t01", "samples": [{"lat": 7.5}]}]
+        )
+        response = self.client.post(
+            reverse("agent-telemetry-gateway"), data=body, content_type=BINARY_CONTENT_TYPE
+        )
+        self.assertTrue(response.json()["results"][0]["ok"])
+        self.drone.refresh_from_db()
+        self.assertEqual(self.drone.last_lat, 7.5)
+
+    def test_ingest_notifies_telemetry_subscribers(self):
+        with telemetry_bus.subscribe(self.drone.pk) as subscription:
+            self.assertFalse(subscription.wait(0))
+            with self.captureOnCommitCallbacks(execute=True):
+                self.post_json(reverse("agent-telemetry"), {"drone_id": "DRX-T01", "lat": 1.0})
+                # Subscribers re-read the database, so they are woken only after commit.
+                self.assertFalse(subscription.wait(0))
+            self.assertTrue(subscription.wait(0))
+
+    def test_delta_updates_merge_into_acknowledged_state(self):
+        url = reverse("agent-telemetry")
+        response = self.post_json(
+            url, {"drone_id": "DRX-T01", "seq": 1, "lat": 1.0, "lng": 2.0, "battery": 90}
+        )
+        self.assertEqual(response.json()["ack_seq"], 1)
+
+        response = self.post_json(
+            url, {"drone_id": "DRX-T01", "mode": "delta", "seq": 2, "base_seq": 1, "battery": 89}
+        )
+        self.assertEqual(response.json()["ack_seq"], 2)
+        self.drone.refresh_from_db()
+        self.assertEqual((self.drone.last_lat, self.drone.last_battery), (1.0, 89))
+        latest = TelemetrySample.objects.for_drone(self.drone).between().last()
+        self.assertEqual((latest.lng, latest.battery), (2.0, 89))
+
+        response = self.post_json(
+            url, {"drone_id": "DRX-T01", "mode": "delta", "seq": 4, "base_seq": 3, "lat": 5.0}
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {"ok": False, "error": "resync_required", "ack_seq": 2})
+
+    def test_dropped_retry_keeps_delta_base(self):
+        url = reverse("agent-telemetry")
+        self.post_json(url, {"seq": 1, "lat": 1.0, "battery": 90})
+        self.assertEqual(self.post_json(url, {"seq": 1, "lat": 1.0}).json()["accepted"], 0)
+        self.post_json(reverse("agent-heartbeat"), {"acks": []})
+        response = self.post_json(url, {"mode": "delta", "seq": 2, "base_seq": 1, "battery": 80})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["ack_seq"], 2)
+
+        # Non-integer sequence numbers never become the acknowledged base.
+        response = self.client.post(
+            url,
+            data='{"seq": 1e400, "lat": 3.0}',
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(json.loads(response.content)["ack_seq"])
+
+    def test_duplicate_and_stale_samples_are_dropped(self):
+        url = reverse("agent-telemetry")
+        response = self.post_json(
+            url,
+            {
+                "drone_id": "DRX-T01",
+                "samples": [{"seq": 3, "lat": 3.0}, {"seq": 2, "lat": 2.0}, {"seq": 3, "lat": 3.0}],
+            },
+        )
+        self.assertEqual((response.json()["accepted"], response.json()["dropped"]), (2, 1))
+        self.drone.refresh_from_db()
+        self.assertEqual(self.drone.last_lat, 3.0)
+
+        response = self.post_json(url, {"drone_id": "DRX-T01", "seq": 1, "lat": 1.0})
+        self.assertEqual((response.json()["accepted"], response.json()["dropped"]), (0, 1))
+        self.drone.refresh_from_db()
+        self.assertEqual(self.drone.last_lat, 3.0)
+        self.assertEqual(TelemetrySample.objects.for_drone(self.drone).count(), 2)
+        self.assertEqual(
+            ingest_metrics.snapshot()[self.drone.pk],
+            {"samples_accepted": 2, "samples_duplicate": 1, "samples_stale": 1},
+        )
+
+        self.post_json(reverse("agent-register"), {"drone_id": "DRX-T01"})
+        response = self.post_json(url, {"drone_id": "DRX-T01", "seq": 1, "lat": 1.0})
+        self.assertEqual(response.json()["accepted"], 1)
+
+    def test_invalid_token(self):
+        response = self.client.post(
+            reverse("agent-telemetry"),
+            data=json.dumps({"drone_id": "DRX-T01"}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION="Bearer wrong",
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_pull_claims_a_batch_in_order(self):
+        first = AgentCommand.objects.create(
+            drone=self.drone, command=AgentCommand.CommandType.START_MISSION
+        )
+        second = AgentCommand.objects.create(
+            drone=self.drone, command=AgentCommand.CommandType.PING
+        )
+        response = self.client.get(reverse("agent-commands-pull"), {"max": 5}, **self.auth)
+        self.assertEqual(
+            [item["id"] for item in response.json()["commands"]], [first.id, second.id]
+        )
+        self.assertEqual(response.json()["command"]["id"], first.id)
+        self.assertEqual(AgentCommand.objects.filter(status=AgentCommand.Status.SENT).count(), 2)
+
+        response = self.client.get(reverse("agent-commands-pull"), **self.auth)
+        self.assertEqual(response.json(), {"ok": True, "command": None, "commands": []})
+
+    def test_route_geometry_is_stored_once_and_served_immutable(self):
+        route = Route.objects.create(
+            name="Ruta G", zone_geojson={"type": "Polygon"}, waypoints=[{"lat": 1.0, "lng": 2.0}]
+        )
+        digest = store_route_geometry(route)
+        self.assertEqual(store_route_geometry(route), digest)
+        self.assertEqual(RouteGeometry.objects.count(), 1)
+
+        url = reverse("agent-route-geometry", args=[digest])
+        response = self.client.get(url, **self.auth)
+        self.assertEqual(hashlib.sha256(response.content).hexdigest(), digest)
+        self.assertEqual(response.json()["waypoints"], [{"lat": 1.0, "lng": 2.0}])
+        self.assertIn("immutable", response["Cache-Control"])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"], **self.auth)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(reverse("agent-route-geometry", args=["0" * 64]), **self.auth)
+        self.assertEqual(response.status_code, 404)
+
+    def test_batched_acks_report_per_item_results(self):
+        other = Drone.objects.create(serial="DRX-T09", model="Falcon")
+        mine = [
+            AgentCommand.objects.create(
+                drone=self.drone, command=AgentCommand.CommandType.PING, status="SENT"
+            )
+            for _ in range(2)
+        ]
+        foreign = AgentCommand.objects.create(drone=other, command=AgentCommand.CommandType.PING)
+        response = self.post_json(
+            reverse("agent-commands-ack"),
+            {
+                "acks": [
+                    {"command_id": mine[0].id, "status": "ACKED"},
+                    {"command_id": mine[1].id, "status": "FAILED", "result": {"error": "gps"}},
+                    {"command_id": foreign.id, "status": "ACKED"},
+                    {"command_id": "abc", "status": "ACKED"},
+                    {"command_id": "²", "status": "ACKED"},
+                    {"command_id": 10**30, "status": "ACKED"},
+                    {"command_id": "9" * 400, "status": "ACKED"},
+                    {"command_id": mine[0].id, "status": ["x"]},
+                ]
+            },
+        )
+        self.assertEqual(
+            [item.get("error") for item in response.json()["acks"]],
+            [None, None, "command_not_found"] + ["invalid_command_id"] * 4 + ["invalid_status"],
+        )
+        self.assertEqual(
+            list(AgentCommand.objects.filter(drone=self.drone).values_list("status", flat=True)),
+            ["ACKED", "FAILED"],
+        )
+        self.assertEqual(AuditLog.objects.filter(action="agent_ack").count(), 2)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.status, AgentCommand.Status.PENDING)
+
+        response = self.post_json(reverse("agent-commands-ack"), {"command_id": foreign.id})
+        self.assertEqual(response.status_code, 400)
+        response = self.post_json(
+            reverse("agent-commands-ack"), {"command_id": "²", "status": "ACKED"}
+        )
+        self.assertEqual(response.json()["error"], "invalid_command_id")
+
+    def test_heartbeat_combines_telemetry_acks_and_pull(self):
+        sent = AgentCommand.objects.create(
+            drone=self.drone,
+            command=AgentCommand.CommandType.START_MISSION,
+            status=AgentCommand.Status.SENT,
+        )
+        queued = AgentCommand.objects.create(
+            drone=self.drone, command=AgentCommand.CommandType.PING
+        )
+        response = self.post_json(
+            reverse("agent-heartbeat"),
+            {
+                "telemetry": {"lat": 8.5, "battery": 70},
+                "acks": [
+                    {"command_id": sent.id, "status": "ACKED", "result": {"ok": 1}},
+                    {"command_id": 999999, "status": "ACKED"},
+                    {"command_id": sent.id, "status": "DONE"},
+                ],
+                "max": 5,
+            },
+        )
+        data = response.json()
+        self.assertEqual(data["accepted"], 1)
+        self.assertEqual(
+            [(item["ok"], item.get("error")) for item in data["acks"]],
+            [(True, None), (False, "command_not_found"), (False, "invalid_status")],
+        )
+        self.assertEqual([item["id"] for item in data["commands"]], [queued.id])
+        self.drone.refresh_from_db()
+        sent.refresh_from_db()
+        self.assertEqual(self.drone.last_lat, 8.5)
+        self.assertEqual((sent.status, sent.result), (AgentCommand.Status.ACKED, {"ok": 1}))
+
+        for limit in ("Infinity", "NaN"):
+            response = self.client.post(
+                reverse("agent-heartbeat"),
+                data=f'{{"max": {limit}}}',
+                content_type="application/json",
+                **self.auth,
+            )
+            self.assertEqual(response.status_code, 200)
+
+    def test_token_alone_identifies_drone(self):
+        response = self.post_json(reverse("agent-telemetry"), {"lat": 7.0})
+        self.assertEqual(response.status_code, 200)
+        self.drone.refresh_from_db()
+        self.assertEqual(self.drone.last_lat, 7.0)
+
+        response = self.post_json(reverse("agent-telemetry"), {"drone_id": "DRX-T02", "lat": 1.0})
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post(
+            reverse("agent-telemetry"),
+            data="{not json",
+            content_type="application/json",
+            HTTP_AUTHORIZATION="Bearer wrong",
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_signed_request(self):
+        key = self.post_json(reverse("agent-register"), {}).json()["signing_key"]
+        url = reverse("agent-telemetry")
+        body = json.dumps({"lat": 6.5}).encode()
+        timestamp = int(time.time())
+        signature = sign_request(key, "POST", url, timestamp, body)
+
+        def post(signature=signature, timestamp=timestamp):
+            return self.client.post(
+                url,
+                data=body,
+                content_type="application/json",
+                HTTP_X_DRONE_ID="DRX-T01",
+                HTTP_X_DRONE_TIMESTAMP=str(timestamp),
+                HTTP_X_DRONE_SIGNATURE=signature,
+            )
+
+        self.assertEqual(post().status_code, 200)
+        self.drone.refresh_from_db()
+        self.assertEqual(self.drone.last_lat, 6.5)
+        self.assertEqual(post().json()["error"], "replayed_signature")
+        unkeyed = sign_request(hash_api_token("tok-t01"), "POST", url, timestamp + 1, body)
+        self.assertEqual(
+            post(signature=unkeyed, timestamp=timestamp + 1).json()["error"], "invalid_signature"
+        )
+        self.assertEqual(post(timestamp=timestamp - 3600).json()["error"], "stale_signature")
+
+    @override_settings(AGENT_RATE_LIMITS={"register": {"drone": (0.1, 2), "global": (100, 100)}})
+    def test_register_is_rate_limited_per_drone(self):
+        url = reverse("agent-register")
+        for _ in range(2):
+            self.assertEqual(self.post_json(url, {"agent_version": "1.0"}).status_code, 200)
+        response = self.post_json(url, {"agent_version": "1.0"})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "10")
+        self.assertEqual(response.json()["report_interval"], 10.0)
+
+    def test_token_cache_is_invalidated_on_regenerate(self):
+        self.post_json(reverse("agent-telemetry"), {"drone_id": "DRX-T01", "lat": 1.0})
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(drone_tokens.get(hash_api_token("tok-t01")))
+
+        admin = get_user_model().objects.create_user(username="admin-t01", is_staff=True)
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(reverse("admin-drone-regenerate-token", args=[self.drone.pk]))
+        self.assertIsNone(drone_tokens.get(hash_api_token("tok-t01")))
+        self.assertEqual(len(callbacks), 1)
+
+        # An invalidation broadcast by another worker reaches this worker's caches too.
+        drone_tokens.put(self.drone)
+        signing_keys.refresh()
+        credentials_bus.publish([self.drone.pk])
+        self.assertIsNone(drone_tokens.get(self.drone.api_token_hash))
+        self.assertTrue(signing_keys.stale())
+        response = self.post_json(reverse("agent-telemetry"), {"drone_id": "DRX-T01", "lat": 2.0})
+        self.assertEqual(response.status_code, 401)
+
+    def test_gateway_updates_many_drones(self):
+        other = Drone.objects.create(
+            serial="DRX-T02", model="Falcon", api_token_hash=hash_api_token("tok-t02")
+        )
+        response = self.client.post(
+            reverse("agent-telemetry-gateway"),
+            data=json.dumps(
+                {
+                    "drones": [
+                        {"drone_id": "DRX-T01", "token": "tok-t01", "lat": 1.5},
+                        {"token": "tok-t02", "samples": [{"lat": 2.5}]},
+                        {"drone_id": "DRX-T02", "token": "bad", "lat": 9.9},
+                        {"drone_id": "DRX-404", "token": "x"},
+                        {"token": "tok-t01", "mode": "delta", "battery": 5},
+                    ]
+                }
+            ),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([item["ok"] for item in results], [True, True, False, False, False])
+        self.assertEqual(results[2]["error"], "invalid_token")
+        self.assertEqual(results[1]["drone_id"], "DRX-T02")
+        self.assertEqual(results[3]["error"], "invalid_token")
+        self.assertEqual(results[4]["error"], "delta_not_supported")
+        self.drone.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.drone.last_lat, self.drone.last_battery), (1.5, None))
+        self.assertEqual(other.last_lat, 2.5)
+
+
+@override_settings(TELEMETRY_WRITE_BEHIND=False)
+class AsyncAgentApiTests(TestCase):
+    async def test_long_poll_wakes_when_command_is_enqueued(self):
+        drone = await Drone.objects.acreate(
+            serial="DRX-S02", model="Falcon", api_token_hash=hash_api_token("tok-s02")
+        )
+        pull = asyncio.ensure_future(
+            AsyncClient().get(
+                reverse("agent-async-commands-pull"),
+                {"wait": 5},
+                headers={"Authorization": "Bearer tok-s02"},
+            )
+        )
+        await asyncio.sleep(0.1)
+        self.assertFalse(pull.done())
+
+        def enqueue():
+            with self.captureOnCommitCallbacks(execute=True):
+                return AgentCommand.objects.create(
+                    drone=drone, command=AgentCommand.CommandType.PING
+                )
+
+        command = await sync_to_async(enqueue)()
+        response = await asyncio.wait_for(pull, 2)
+        self.assertEqual(response.json()["command"]["id"], command.id)
+
+    async def test_async_telemetry_and_command_cycle(self):
+        drone = await Drone.objects.acreate(
+            serial="DRX-S01", model="Falcon", api_token_hash=hash_api_token("tok-s01")
+        )
+        command = await AgentCommand.objects.acreate(
+            drone=drone, command=AgentCommand.CommandType.PING
+        )
+        client = AsyncClient()
+        auth = {"Authorization": "Bearer tok-s01"}
+
+        response = await client.post(
+            reverse("agent-async-telemetry"),
+            data={"drone_id": "DRX-S01", "lat": 5.5},
+            content_type="application/json",
+            headers=auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        await drone.arefresh_from_db()
+        self.assertEqual(drone.last_lat, 5.5)
+
+        response = await client.get(
+            reverse("agent-async-commands-pull"), {"drone_id": "DRX-S01"}, headers=auth
+        )
+        self.assertEqual(response.json()["command"]["id"], command.id)
+
+        response = await client.post(
+            reverse("agent-async-commands-ack"),
+            data={"drone_id": "DRX-S01", "command_id": command.id, "status": "ACKED"},
+            content_type="application/json",
+            headers=auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        await command.arefresh_from_db()
+        self.assertEqual(command.status, AgentCommand.Status.ACKED)
+
+
+class CommandSweeperTests(TestCase):
+    def test_stale_commands_are_requeued_or_failed(self):
+        drone = Drone.objects.create(serial="DRX-W01", model="Falcon")
+        now = timezone.now()
+        old = now - timedelta(minutes=10)
+
+        def sent(command_type, sent_at):
+            return AgentCommand.objects.create(
+                drone=drone,
+                command=command_type,
+                status=AgentCommand.Status.SENT,
+                sent_at=sent_at,
+                attempts=1,
+            )
+
+        mission = sent(AgentCommand.CommandType.START_MISSION, old)
+        ping = sent(AgentCommand.CommandType.PING, old)
+        recent = sent(AgentCommand.CommandType.PING, now)
+
+        self.assertEqual(sweep_stale_commands(now=now), (1, 1))
+        statuses = dict(AgentCommand.objects.values_list("id", "status"))
+        self.assertEqual(statuses[mission.id], AgentCommand.Status.PENDING)
+        self.assertEqual(statuses[ping.id], AgentCommand.Status.FAILED)
+        self.assertEqual(statuses[recent.id], AgentCommand.Status.SENT)
+        self.assertEqual(
+            sorted(AuditLog.objects.values_list("action", flat=True)),
+            ["command_requeue", "command_timeout"],
+        )
+
+
+class CommandArchiveTests(TestCase):
+    def test_old_finished_commands_move_to_archive(self):
+        drone = Drone.objects.create(serial="DRX-V01", model="Falcon")
+        now = timezone.now()
+
+        def command(status, days_ago):
+            command = AgentCommand.objects.create(
+                drone=drone, command=AgentCommand.CommandType.PING, status=status
+            )
+            created_at = now - timedelta(days=days_ago)
+            AgentCommand.objects.filter(id=command.id).update(created_at=created_at)
+            return command.id
+
+        acked = command(AgentCommand.Status.ACKED, 30)
+        failed = command(AgentCommand.Status.FAILED, 20)
+        pending = command(AgentCommand.Status.PENDING, 25)
+        recent = command(AgentCommand.Status.ACKED, 0)
+
+        self.assertEqual(archive_commands(batch_size=1, days=7, now=now), 2)
+        self.assertEqual(
+            sorted(AgentCommand.objects.values_list("id", flat=True)), [pending, recent]
+        )
+        self.assertEqual(
+            sorted(ArchivedAgentCommand.objects.values_list("id", flat=True)), [acked, failed]
+        )
+        self.assertEqual(
+            [item.id for item in command_history(drone, limit=4)], [recent, failed, pending, acked]
+        )
+        self.assertEqual([item.id for item in command_history(drone, limit=1)], [recent])
+
+        # A shorter --days run can archive rows newer than the ones left in the hot table.
+        queued = command(AgentCommand.Status.PENDING, 1)
+        self.assertEqual(archive_commands(days=0, now=now + timedelta(seconds=1)), 1)
+        self.assertEqual([item.id for item in command_history(drone, limit=1)], [recent])
+        self.assertEqual(
+            {item.id: isinstance(item, ArchivedAgentCommand) for item in command_history(limit=10)},
+            {acked: True, failed: True, pending: False, queued: False, recent: True},
+        )
+
+        admin = get_user_model().objects.create_superuser("root", "root@example.com", "x")
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse("admin:integrations_agentcommand_history"), {"drone": "DRX-V01"}
+        )
+        self.assertEqual(len(response.context["rows"]), 5)
+        self.assertContains(response, "DRX-V01")
+
+
+class CommandBusTests(SimpleTestCase):
+    def test_socket_bus_wakes_subscribers_in_other_workers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            worker, producer = SocketBus(directory), SocketBus(directory)
+            try:
+                with worker.subscribe(7) as subscription:
+                    producer.publish([8])
+                    self.assertFalse(subscription.wait(0.2))
+                    producer.publish([7])
+                    self.assertTrue(subscription.wait(2))
+                received = threading.Event()
+                worker.listen(lambda drone_pks: 5 in drone_pks and received.set())
+                producer.publish([5])
+                self.assertTrue(received.wait(2))
+                # Large batches are split across datagrams instead of being dropped.
+                with worker.subscribe(9) as subscription:
+                    producer.publish([*range(10000, 12000), 9])
+                    self.assertTrue(subscription.wait(2))
+            finally:
+                worker.close()
+                producer.close()
+
+
+# An hour-long interval keeps the background flusher out of the way; tests flush explicitly.
+@override_settings(TELEMETRY_WRITE_BEHIND=True, TELEMETRY_FLUSH_INTERVAL_MS=3_600_000)
+class DroneStateBufferTests(TestCase):
+    def setUp(self):
+        self.drone = Drone.objects.create(
+            serial="DRX-B01", model="Falcon", api_token_hash=hash_api_token("tok-b01")
+        )
+
+    def tearDown(self):
+        state_buffer.flush()
+
+    def test_buffer_coalesces_until_flush(self):
+        for lat in (1.0, 2.0, 3.0):
+            response = Client().post(
+                reverse("agent-telemetry"),
+                data=json.dumps({"drone_id": "DRX-B01", "lat": lat}),
+                content_type="application/json",
+                HTTP_AUTHORIZATION="Bearer tok-b01",
+            )
+            self.assertEqual(response.status_code, 200)
+
+        self.drone.refresh_from_db()
+        self.assertIsNone(self.drone.last_lat)
+        self.assertEqual(state_buffer.overlay(self.drone).last_lat, 3.0)
+
+        with telemetry_bus.subscribe(self.drone.pk) as subscription:
+            self.assertFalse(subscription.wait(0))
+            self.assertEqual(state_buffer.flush(), 1)
+            self.assertTrue(subscription.wait(0))
+        self.drone.refresh_from_db()
+        self.assertEqual(self.drone.last_lat, 3.0)
+        self.assertEqual(TelemetrySample.objects.for_drone(self.drone).count(), 3)
+
+    @override_settings(TELEMETRY_FLUSH_INTERVAL_MS=0)
+    def test_non_positive_interval_writes_synchronously(self):
+        self.assertFalse(state_buffer.enabled)
+        response = Client().post(
+            reverse("agent-telemetry"),
+            data=json.dumps({"lat": 4.0}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION="Bearer tok-b01",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.drone.refresh_from_db()
+        self.assertEqual(self.drone.last_lat, 4.0)
+
+    def test_bad_state_is_dropped_without_blocking_other_drones(self):
+        response = Client().post(
+            reverse("agent-telemetry"),
+            data=json.dumps({"lat": "abc"}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION="Bearer tok-b01",
+        )
+        self.assertEqual(response.status_code, 400)
+
+        other = Drone.objects.create(serial="DRX-B02", model="Falcon")
+        now = timezone.now()
+        state_buffer.record(
+            {
+                self.drone.pk: {"last_lat": "abc", "last_seen": now},
+                other.pk: {"last_lat": 5.0, "last_seen": now},
+            }
+        )
+        with self.assertLogs("integrations.buffer", "ERROR"):
+            self.assertEqual(state_buffer.flush(), 1)
+        other.refresh_from_db()
+        self.assertEqual(other.last_lat, 5.0)
+        self.assertEqual(state_buffer.pending_state(self.drone.pk), {})
+
+
+class TelemetryRollupTests(TestCase):
+    def test_incremental_minute_and_hour_rollups(self):
+        drone = Drone.objects.create(serial="DRX-R01", model="Falcon")
+        base = timezone.now().replace(hour=10, minute=0, second=0, microsecond=0)
+        rows = [
+            TelemetrySample(drone=drone, recorded_at=base, received_at=base, alt=10, battery=90),
+            TelemetrySample(
+                drone=drone, recorded_at=base + timedelta(seconds=30), received_at=base, alt=30
+            ),
+            TelemetrySample(
+                drone=drone, recorded_at=base + timedelta(minutes=1), received_at=base, alt=50
+            ),
+        ]
+        TelemetrySample.objects.bulk_create(rows)
+        self.assertEqual(run_rollups(), 3)
+        self.assertEqual(run_rollups(), 0)
+
+        minutes = list(TelemetryRollup.objects.for_drone(drone).minutes().between())
+        self.assertEqual([rollup.sample_count for rollup in minutes], [2, 1])
+        self.assertEqual(minutes[0].avg_alt, 20)
+        self.assertEqual(minutes[0].avg_battery, 90)
+
+        TelemetrySample.objects.create(
+            drone=drone, recorded_at=base + timedelta(seconds=10), received_at=base, alt=20
+        )
+        self.assertEqual(run_rollups(), 1)
+        hour = TelemetryRollup.objects.for_drone(drone).hours().get()
+        self.assertEqual(hour.sample_count, 4)
+        self.assertEqual(hour.min_alt, 10)
+        self.assertEqual(hour.max_alt, 50)
+        self.assertAlmostEqual(hour.avg_alt, 27.5)
+
+    def test_hour_average_weights_partly_null_minutes_by_metric_count(self):
+        drone = Drone.objects.create(serial="DRX-R02", model="Falcon")
+        base = timezone.now().replace(hour=10, minute=0, second=0, microsecond=0)
+        rows = [
+            TelemetrySample(
+                drone=drone,
+                recorded_at=base + timedelta(seconds=second),
+                received_at=base,
+                alt=100 if second == 0 else None,
+            )
+            for second in range(10)
+        ] + [
+            TelemetrySample(
+                drone=drone,
+                recorded_at=base + timedelta(minutes=1, seconds=second),
+                received_at=base,
+                alt=0,
+            )
+            for second in range(10)
+        ]
+        TelemetrySample.objects.bulk_create(rows)
+        run_rollups()
+        hour = TelemetryRollup.objects.for_drone(drone).hours().get()
+        self.assertAlmostEqual(hour.avg_alt, 100 / 11)
+
+        # A far-off late sample only recomputes its own minute and hour.
+        TelemetryRollup.objects.for_drone(drone).minutes().update(avg_battery=-1)
+        TelemetrySample.objects.create(
+            drone=drone,
+            recorded_at=datetime(1970, 1, 1, tzinfo=dt_timezone.utc),
+            received_at=base,
+            alt=5,
+        )
+        self.assertEqual(run_rollups(), 1)
+        self.assertEqual(TelemetryRollup.objects.for_drone(drone).hours().count(), 2)
+        self.assertEqual(
+            TelemetryRollup.objects.for_drone(drone).minutes().filter(avg_battery=-1).count(), 2
+        )
+
+
+class TelemetryArchiveTests(TestCase):
+    def test_archive_round_trip(self):
+        drone = Drone.objects.create(serial="DRX-A01", model="Falcon")
+        pilot = get_user_model().objects.create_user(username="pilot-a01")
+        route = Route.objects.create(name="Ruta A", zone_geojson={}, waypoints=[])
+        now = timezone.now()
+        shift = Shift.objects.create(
+            pilot=pilot, drone=drone, route=route, start_at=now, end_at=now + timedelta(hours=1)
+        )
+        session = OperationSession.objects.create(
+            shift=shift, started_at=now, status=OperationSession.Status.ENDED
+        )
+        TelemetrySample.objects.bulk_create(
+            TelemetrySample(
+                drone=drone,
+                session=session,
+                recorded_at=now + timedelta(seconds=index),
+                received_at=now,
+                lat=float(index),
+                battery=None if index == 1 else 100 - index,
+                heading=40000 if index == 4 else None,
+            )
+            for index in range(5)
+        )
+
+        with tempfile.TemporaryDirectory() as root, self.settings(TELEMETRY_ARCHIVE_ROOT=root):
+            self.assertEqual(archive_session(session).sample_count, 5)
+            with open_archive(session.id) as archive:
+                self.assertEqual(archive.column("lat").tolist(), [0.0, 1.0, 2.0, 3.0, 4.0])
+                self.assertEqual(archive.column("battery").tolist(), [100, -1, 98, 97, 96])
+                self.assertEqual(archive.column("heading")[4], 40000)
+                window = archive.slice(now + timedelta(seconds=1), now + timedelta(seconds=3))
+                self.assertEqual(window["lat"].tolist(), [1.0, 2.0])
+            # Views handed out by the archive stay readable after it is closed.
+            self.assertEqual(window["lat"].tolist(), [1.0, 2.0])
+            self.assertEqual(memoryview(window["battery"]).tolist(), [-1, 98])
+
+            # A sample flushed late by another worker makes the sweep rebuild the archive.
+            TelemetrySample.objects.create(
+                drone=drone, session=session, recorded_at=now, received_at=now, lat=9.0
+            )
+            call_command("archive_telemetry", stdout=io.StringIO())
+            session.telemetry_archive.refresh_from_db()
+            self.assertEqual(session.telemetry_archive.sample_count, 6)
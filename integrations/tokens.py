@@ -0,0 +1,145 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from functools import cache, partial
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+
+from fleet.models import Drone
+from integrations.bus import credentials_bus
+
+
+@cache
+def drone_lookup_field():
+    try:
+        Drone._meta.get_field("drone_id")
+    except FieldDoesNotExist:
+        return "serial"
+    return "drone_id"
+
+
+def drone_identifier(drone):
+    return str(getattr(drone, drone_lookup_field()))
+
+
+class CredentialListener:
+    # A cache starts following invalidations from every worker before it first loads.
+    _listening = False
+
+    def _listen(self):
+        with self._lock:
+            if self._listening:
+                return
+            self._listening = True
+        credentials_bus.listen(self._invalidated)
+
+    def _invalidated(self, drone_pks):
+        raise NotImplementedError
+
+
+class DroneTokenCache(CredentialListener):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @property
+    def ttl(self):
+        return getattr(settings, "AGENT_TOKEN_CACHE_TTL", 60)
+
+    @property
+    def max_entries(self):
+        return getattr(settings, "AGENT_TOKEN_CACHE_SIZE", 10000)
+
+    def get(self, token_hash):
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is None:
+                return None
+            expires_at, drone = entry
+            if expires_at <= time.monotonic():
+                del self._entries[token_hash]
+                return None
+            self._entries.move_to_end(token_hash)
+        # Callers get their own instance so request code can set attributes freely.
+        return copy.copy(drone)
+
+    def put(self, drone):
+        if self.ttl <= 0 or not drone.api_token_hash:
+            return
+        self._listen()
+        with self._lock:
+            self._entries[drone.api_token_hash] = (time.monotonic() + self.ttl, copy.copy(drone))
+            self._entries.move_to_end(drone.api_token_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, drone_pk):
+        with self._lock:
+            for token_hash in [
+                token_hash
+                for token_hash, (_, drone) in self._entries.items()
+                if drone.pk == drone_pk
+            ]:
+                del self._entries[token_hash]
+
+    def _invalidated(self, drone_pks):
+        for drone_pk in drone_pks:
+            self.invalidate(drone_pk)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SigningKeyTable(CredentialListener):
+    # Identifier -> drone (its signing key derives from api_token_hash), reloaded wholesale
+    # so signed requests never touch the database between refreshes.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._drones = {}
+        self._loaded_at = None
+
+    @property
+    def refresh_interval(self):
+        return getattr(settings, "AGENT_SIGNING_KEYS_REFRESH", 60)
+
+    def stale(self):
+        with self._lock:
+            return (
+                self._loaded_at is None
+                or time.monotonic() - self._loaded_at >= self.refresh_interval
+            )
+
+    def refresh(self):
+        self._listen()
+        drones = Drone.objects.exclude(api_token_hash__isnull=True)
+        table = {drone_identifier(drone): drone for drone in drones}
+        with self._lock:
+            self._drones = table
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _invalidated(self, drone_pks):
+        self.invalidate()
+
+    def get(self, identifier):
+        with self._lock:
+            drone = self._drones.get(identifier)
+        return copy.copy(drone) if drone else None
+
+
+drone_tokens = DroneTokenCache()
+signing_keys = SigningKeyTable()
+
+
+def invalidate_drone_credentials(drone_pk):
+    drone_tokens.invalidate(drone_pk)
+    signing_keys.invalidate()
+    # Other workers drop their copies once the new token is committed; TTLs are only a backstop.
+    transaction.on_commit(partial(credentials_bus.publish, [drone_pk]))
@@ -1,10 +1,18 @@
 from django.urls import path
 
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path("register/", views.register_agent, name="agent-register"),
     path("telemetry/", views.telemetry, name="agent-telemetry"),
+    path("telemetry/gateway/", views.telemetry_gateway, name="agent-telemetry-gateway"),
+    path("metrics/", views.ingest_metrics_view, name="agent-metrics"),
+    path("heartbeat/", views.heartbeat, name="agent-heartbeat"),
     path("commands/pull/", views.pull_commands, name="agent-commands-pull"),
     path("ack/", views.ack_command, name="agent-commands-ack"),
+    path("routes/<str:digest>/", views.route_geometry, name="agent-route-geometry"),
+    path("async/register/", async_views.register_agent, name="agent-async-register"),
+    path("async/telemetry/", async_views.telemetry, name="agent-async-telemetry"),
+    path("async/commands/pull/", async_views.pull_commands, name="agent-async-commands-pull"),
+    path("async/ack/", async_views.ack_command, name="agent-async-commands-ack"),
 ]
@@ -1,21 +1,76 @@
 import json
+import math
+import time
 
-from django.core.exceptions import FieldDoesNotExist
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
 from django.db import transaction
+from django.db.models import F
 from django.db.utils import OperationalError, ProgrammingError
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
 from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
 from django.views.decorators.csrf import csrf_exempt
 
-from audit.utils import log_event
+from accounts.decorators import role_required
+from audit.utils import log_event, log_events
 from fleet.models import Drone
-from integrations.models import AgentCommand
+from fleet.tokens import hash_api_token
+from integrations.buffer import save_telemetry
+from integrations.bus import command_bus
+from integrations.delta import DELTA_MODE, ResyncRequired, delta_tracker
+from integrations.metrics import ingest_metrics
+from integrations.models import AgentCommand, RouteGeometry
+from integrations.ratelimit import agent_limiter, retry_after_header
+from integrations.routes import canonical_geometry
+from integrations.sequencing import sequence_guard
+from integrations.signing import is_signed, signing_key, verify_signed_request
+from integrations.telemetry import (
+    MAX_BATCH_SAMPLES,
+    MAX_GATEWAY_DRONES,
+    NDJSON_CONTENT_TYPES,
+    build_drone_update,
+    build_sample_rows,
+    clean_samples,
+    latest_sample,
+    parse_ndjson_body,
+    running_session_ids,
+)
+from integrations.tokens import drone_identifier, drone_tokens, signing_keys
+from integrations.wire import BINARY_CONTENT_TYPE, decode_gateway, decode_samples
+
+
+MAX_PULL_COMMANDS = 50
+MAX_BATCH_ACKS = 100
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+ACK_STATUSES = {AgentCommand.Status.ACKED, AgentCommand.Status.FAILED}
+MAX_COMMAND_ID = 2**63 - 1
 
 
 def json_error(message, status):
     return JsonResponse({"ok": False, "error": message}, status=status)
 
 
+def resync_response(exc):
+    return JsonResponse(
+        {"ok": False, "error": "resync_required", "ack_seq": exc.ack_seq}, status=409
+    )
+
+
+def rate_limited_response(endpoint, retry_after):
+    response = JsonResponse(
+        {
+            "ok": False,
+            "error": "rate_limited",
+            "retry_after": round(retry_after, 3),
+            "report_interval": agent_limiter.report_interval(endpoint),
+        },
+        status=429,
+    )
+    response["Retry-After"] = retry_after_header(retry_after)
+    return response
+
+
 def parse_json_body(request):
     if not request.body:
         return {}
@@ -33,52 +88,102 @@ def get_bearer_token(request):
     return token or None
 
 
-def find_drone_by_id(drone_id):
-    lookup_field = "serial"
-    try:
-        Drone._meta.get_field("drone_id")
-        lookup_field = "drone_id"
-    except FieldDoesNotExist:
-        pass
-    return Drone.objects.filter(**{lookup_field: drone_id}).first()
+def drone_matches(drone, drone_id):
+    # drone_id is optional now that the token identifies the drone; if sent it must agree.
+    return not drone_id or drone_identifier(drone) == str(drone_id)
+
+
+def find_drones_by_token_hashes(token_hashes):
+    drones = Drone.objects.filter(api_token_hash__in=token_hashes)
+    return {drone.api_token_hash: drone for drone in drones}
 
 
-def authorize_drone(request, drone_id):
+def signed_drone(request, drone_id):
+    drone, error = verify_signed_request(request)
+    if error:
+        return None, json_error(error, status=401)
+    if not drone_matches(drone, drone_id):
+        return None, json_error("invalid_token", status=401)
+    return drone, None
+
+
+# The helpers below hold everything the sync views share with async_views; each view
+# only strings them together around its own (awaited or blocking) ORM calls.
+
+
+def cached_bearer_drone(request):
+    # Returns (token, token_hash, drone, error); drone is None when the cache misses.
     token = get_bearer_token(request)
     if not token:
-        return None, json_error("missing_token", status=401)
+        return None, None, None, json_error("missing_token", status=401)
+    token_hash = hash_api_token(token)
+    return token, token_hash, drone_tokens.get(token_hash), None
 
-    try:
-        drone = find_drone_by_id(drone_id)
-    except (OperationalError, ProgrammingError):
-        return None, json_error("service_unavailable", status=503)
 
-    if not drone:
-        return None, json_error("drone_not_found", status=404)
+def cache_bearer_drone(drone, token):
+    if not drone or not drone.check_api_token(token):
+        return None
+    drone_tokens.put(drone)
+    return drone
 
-    if not drone.api_token or drone.api_token != token:
-        return None, json_error("invalid_token", status=401)
 
+def matched_drone(drone, drone_id):
+    if drone is None or not drone_matches(drone, drone_id):
+        return None, json_error("invalid_token", status=401)
     return drone, None
 
 
-@csrf_exempt
-def register_agent(request):
-    if request.method != "POST":
-        return json_error("method_not_allowed", status=405)
+def throttled(endpoint, drone=None):
+    retry_after = agent_limiter.check(endpoint, drone.pk if drone else None)
+    return rate_limited_response(endpoint, retry_after) if retry_after else None
 
-    payload = parse_json_body(request)
-    if payload is None:
-        return json_error("invalid_json", status=400)
 
-    drone_id = payload.get("drone_id")
-    if not drone_id:
-        return json_error("missing_drone_id", status=400)
+def authenticate_drone(request, drone_id=None):
+    if is_signed(request):
+        if signing_keys.stale():
+            try:
+                signing_keys.refresh()
+            except (OperationalError, ProgrammingError):
+                return None, json_error("service_unavailable", status=503)
+        return signed_drone(request, drone_id)
 
-    drone, error = authorize_drone(request, drone_id)
+    token, token_hash, drone, error = cached_bearer_drone(request)
     if error:
-        return error
+        return None, error
+    if drone is None:
+        try:
+            drone = Drone.objects.filter(api_token_hash=token_hash).first()
+        except (OperationalError, ProgrammingError):
+            return None, json_error("service_unavailable", status=503)
+        drone = cache_bearer_drone(drone, token)
+    return matched_drone(drone, drone_id)
+
+
+def authorize_drone(request, endpoint, drone_id=None):
+    # The global bucket is checked before authentication so floods never reach the database.
+    error = throttled(endpoint)
+    if error:
+        return None, error
 
+    drone, error = authenticate_drone(request, drone_id)
+    if error:
+        return None, error
+
+    error = throttled(endpoint, drone)
+    return (None, error) if error else (drone, None)
+
+
+def registration_payload(request, drone):
+    payload = parse_json_body(request)
+    if not isinstance(payload, dict):
+        return None, json_error("invalid_json", status=400)
+    if not drone_matches(drone, payload.get("drone_id")):
+        return None, json_error("invalid_token", status=401)
+    return payload, None
+
+
+def apply_registration(drone, payload):
+    # Sets the registration fields on drone and returns their names for save().
     update_fields = {"last_seen": timezone.now()}
     agent_version = payload.get("agent_version")
     if agent_version:
@@ -86,150 +191,593 @@ def register_agent(request):
 
     for field, value in update_fields.items():
         setattr(drone, field, value)
-    drone.save(update_fields=list(update_fields.keys()))
-
-    log_event(
-        actor=None,
-        action="agent_register",
-        object_type="Drone",
-        object_id=str(drone.serial),
-        request=request,
-        metadata={"agent_version": agent_version, "mode": payload.get("mode")},
-    )
+    return list(update_fields.keys())
+
 
-    return JsonResponse({"ok": True, "message": "registered"})
+def registration_event(request, drone, payload):
+    return {
+        "actor": None,
+        "action": "agent_register",
+        "object_type": "Drone",
+        "object_id": str(drone.serial),
+        "request": request,
+        "metadata": {"agent_version": payload.get("agent_version"), "mode": payload.get("mode")},
+    }
+
+
+def registration_response(request, drone):
+    response = {"ok": True, "message": "registered"}
+    if not is_signed(request):
+        response["signing_key"] = signing_key(drone.api_token_hash)
+    return JsonResponse(response)
 
 
 @csrf_exempt
-def telemetry(request):
+def register_agent(request):
     if request.method != "POST":
         return json_error("method_not_allowed", status=405)
 
-    payload = parse_json_body(request)
-    if payload is None:
-        return json_error("invalid_json", status=400)
-
-    drone_id = payload.get("drone_id")
-    if not drone_id:
-        return json_error("missing_drone_id", status=400)
+    drone, error = authorize_drone(request, "register", request.GET.get("drone_id"))
+    if error:
+        return error
 
-    drone, error = authorize_drone(request, drone_id)
+    payload, error = registration_payload(request, drone)
     if error:
         return error
 
-    update_fields = {
-        "last_lat": payload.get("lat"),
-        "last_lng": payload.get("lng"),
-        "last_alt": payload.get("alt"),
-        "last_battery": payload.get("battery"),
-        "last_signal": payload.get("signal"),
-        "last_heading": payload.get("heading"),
-        "last_seen": timezone.now(),
-    }
+    drone.save(update_fields=apply_registration(drone, payload))
+    # A (re)started agent begins a new sequence.
+    sequence_guard.reset(drone.pk)
+    log_event(**registration_event(request, drone, payload))
+    return registration_response(request, drone)
 
-    status = payload.get("status")
-    if status in {"LOST_LINK", "NO_SIGNAL"}:
-        update_fields["status"] = Drone.Status.LOST_LINK
 
-    for field, value in update_fields.items():
-        setattr(drone, field, value)
-    drone.save(update_fields=list(update_fields.keys()))
+def samples_from_json(payload):
+    if isinstance(payload, dict):
+        return payload.get("samples") if "samples" in payload else [payload]
+    return payload
 
-    return JsonResponse({"ok": True})
+
+def telemetry_writes(drone, samples, session_id, now, changed=None):
+    # Returns the (states, rows) pair save_telemetry expects.
+    return (
+        {drone.pk: build_drone_update(latest_sample(samples), now, keys=changed)},
+        build_sample_rows(drone, samples, session_id, now),
+    )
+
+
+def record_samples(drone, samples, now, changed=None):
+    session_id = running_session_ids([drone.pk]).get(drone.pk)
+    save_telemetry(*telemetry_writes(drone, samples, session_id, now, changed))
+
+
+def parse_telemetry_samples(request):
+    payload = None
+    if request.content_type == BINARY_CONTENT_TYPE:
+        samples = decode_samples(request.body)
+        if samples is None:
+            return None, None, json_error("invalid_frame", status=400)
+    elif request.content_type in NDJSON_CONTENT_TYPES:
+        samples = parse_ndjson_body(request.body)
+        if samples is None:
+            return None, None, json_error("invalid_json", status=400)
+    else:
+        payload = parse_json_body(request)
+        if payload is None:
+            return None, None, json_error("invalid_json", status=400)
+        samples = samples_from_json(payload)
+
+    samples = clean_samples(samples)
+    if samples is None:
+        return None, None, json_error("invalid_samples", status=400)
+    if len(samples) > MAX_BATCH_SAMPLES:
+        return None, None, json_error("batch_too_large", status=413)
+
+    drone_id = None
+    if isinstance(payload, dict):
+        drone_id = payload.get("drone_id")
+    if not drone_id and samples:
+        drone_id = samples[0].get("drone_id")
+    return drone_id, samples, None
+
+
+def telemetry_response(drone, accepted, dropped):
+    return JsonResponse(
+        {
+            "ok": True,
+            "accepted": accepted,
+            "dropped": dropped,
+            "ack_seq": delta_tracker.ack_seq(drone.pk),
+        }
+    )
+
+
+def resolve_telemetry(request, drone):
+    # Returns (samples, changed, dropped, response); a response means there is nothing to write.
+    drone_id, samples, error = parse_telemetry_samples(request)
+    if error:
+        return None, None, 0, error
+    if not drone_matches(drone, drone_id):
+        return None, None, 0, json_error("invalid_token", status=401)
+
+    samples, dropped = sequence_guard.filter(drone.pk, samples)
+    try:
+        samples, changed = delta_tracker.resolve(drone.pk, samples)
+    except ResyncRequired as exc:
+        return None, None, dropped, resync_response(exc)
+    if latest_sample(samples) is None:
+        return samples, changed, dropped, telemetry_response(drone, 0, dropped)
+    return samples, changed, dropped, None
+
+
+def accept_telemetry(drone, samples, dropped):
+    sequence_guard.advance(drone.pk, samples)
+    return telemetry_response(drone, len(samples), dropped)
 
 
 @csrf_exempt
-def pull_commands(request):
-    if request.method != "GET":
+def telemetry(request):
+    if request.method != "POST":
         return json_error("method_not_allowed", status=405)
 
-    drone_id = request.GET.get("drone_id")
-    if not drone_id:
-        return json_error("missing_drone_id", status=400)
-
-    drone, error = authorize_drone(request, drone_id)
+    drone, error = authorize_drone(request, "telemetry", request.GET.get("drone_id"))
     if error:
         return error
 
+    samples, changed, dropped, response = resolve_telemetry(request, drone)
+    if response:
+        return response
+
     try:
-        with transaction.atomic():
-            command = (
-                AgentCommand.objects.select_for_update()
-                .filter(drone=drone, status=AgentCommand.Status.PENDING)
-                .order_by("created_at")
-                .first()
-            )
-            if not command:
-                return JsonResponse({"ok": True, "command": None})
-            command.status = AgentCommand.Status.SENT
-            command.sent_at = timezone.now()
-            command.save(update_fields=["status", "sent_at"])
+        record_samples(drone, samples, timezone.now(), changed)
+    except (OperationalError, ProgrammingError):
+        return json_error("service_unavailable", status=503)
+    return accept_telemetry(drone, samples, dropped)
+
+
+@csrf_exempt
+def telemetry_gateway(request):
+    if request.method != "POST":
+        return json_error("method_not_allowed", status=405)
+
+    retry_after = agent_limiter.check("gateway")
+    if retry_after:
+        return rate_limited_response("gateway", retry_after)
+
+    if request.content_type == BINARY_CONTENT_TYPE:
+        entries = decode_gateway(request.body)
+        if entries is None:
+            return json_error("invalid_frame", status=400)
+    else:
+        payload = parse_json_body(request)
+        if not isinstance(payload, dict):
+            return json_error("invalid_json", status=400)
+        entries = payload.get("drones")
+
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        return json_error("invalid_drones", status=400)
+    if len(entries) > MAX_GATEWAY_DRONES:
+        return json_error("batch_too_large", status=413)
+
+    bearer_token = get_bearer_token(request)
+    tokens = [entry.get("token") or bearer_token for entry in entries]
+    token_hashes = [hash_api_token(token) if isinstance(token, str) else None for token in tokens]
+    drones = {}
+    for token_hash in token_hashes:
+        drone = drone_tokens.get(token_hash) if token_hash else None
+        if drone:
+            drones[token_hash] = drone
+    missing = {token_hash for token_hash in token_hashes if token_hash and token_hash not in drones}
+    if missing:
+        try:
+            found = find_drones_by_token_hashes(missing)
+        except (OperationalError, ProgrammingError):
+            return json_error("service_unavailable", status=503)
+        for drone in found.values():
+            drone_tokens.put(drone)
+        drones.update(found)
+
+    now = timezone.now()
+    results = []
+    states = {}
+    accepted_samples = []
+    for entry, token, token_hash in zip(entries, tokens, token_hashes):
+        drone = drones.get(token_hash)
+        drone_id = entry.get("drone_id") or (drone_identifier(drone) if drone else None)
+        samples = clean_samples(entry.get("samples") if "samples" in entry else [entry])
+        error = None
+        if not token:
+            error = "missing_token"
+        elif not drone or not drone.check_api_token(token) or not drone_matches(drone, drone_id):
+            error = "invalid_token"
+        elif samples is None:
+            error = "invalid_samples"
+        elif len(samples) > MAX_BATCH_SAMPLES:
+            error = "batch_too_large"
+        elif any(sample.get("mode") == DELTA_MODE for sample in samples):
+            # Gateways keep no per-drone delta base; a partial sample would blank the rest.
+            error = "delta_not_supported"
+        elif agent_limiter.check("gateway", drone.pk):
+            error = "rate_limited"
+        if error:
+            results.append({"drone_id": drone_id, "ok": False, "error": error})
+            continue
+
+        samples, dropped = sequence_guard.filter(drone.pk, samples)
+        sample = latest_sample(samples)
+        if sample is not None:
+            states[drone.pk] = build_drone_update(sample, now)
+            accepted_samples.append((drone, samples))
+        results.append(
+            {"drone_id": drone_id, "ok": True, "accepted": len(samples), "dropped": dropped}
+        )
+
+    if states:
+        try:
+            session_ids = running_session_ids(list(states.keys()))
+            rows = []
+            for drone, samples in accepted_samples:
+                rows.extend(build_sample_rows(drone, samples, session_ids.get(drone.pk), now))
+            save_telemetry(states, rows)
+        except (OperationalError, ProgrammingError):
+            return json_error("service_unavailable", status=503)
+        for drone, samples in accepted_samples:
+            sequence_guard.advance(drone.pk, samples)
+
+    return JsonResponse({"ok": True, "results": results})
+
+
+@login_required
+@role_required("ADMIN")
+def ingest_metrics_view(request):
+    counters = ingest_metrics.snapshot()
+    try:
+        serials = dict(Drone.objects.filter(pk__in=counters).values_list("pk", "serial"))
     except (OperationalError, ProgrammingError):
-        return JsonResponse({"ok": True, "command": None})
+        serials = {}
+    return JsonResponse(
+        {
+            "ok": True,
+            "drones": [
+                {"drone": drone_pk, "serial": serials.get(drone_pk), **values}
+                for drone_pk, values in sorted(counters.items())
+            ],
+        }
+    )
+
 
+def claim_commands(drone, limit=1):
+    # One locked SELECT and one UPDATE claim the whole batch, however many commands it holds.
+    with transaction.atomic():
+        commands = list(
+            AgentCommand.objects.select_for_update()
+            .filter(drone=drone, status=AgentCommand.Status.PENDING)
+            .order_by("created_at", "id")[:limit]
+        )
+        if not commands:
+            return []
+        sent_at = timezone.now()
+        AgentCommand.objects.filter(id__in=[command.id for command in commands]).update(
+            status=AgentCommand.Status.SENT, sent_at=sent_at, attempts=F("attempts") + 1
+        )
+    for command in commands:
+        command.status = AgentCommand.Status.SENT
+        command.sent_at = sent_at
+        command.attempts += 1
+    return commands
+
+
+def serialize_command(command):
+    return {"id": command.id, "command": command.command, "payload": command.payload}
+
+
+def command_response(commands):
+    # "command" keeps single-command agents working; "commands" carries the full batch.
     return JsonResponse(
         {
             "ok": True,
-            "command": {
-                "id": command.id,
-                "command": command.command,
-                "payload": command.payload,
-            },
+            "command": serialize_command(commands[0]) if commands else None,
+            "commands": [serialize_command(command) for command in commands],
         }
     )
 
 
+def parse_max(value):
+    try:
+        limit = int(value or 1)
+    except (TypeError, ValueError, OverflowError):
+        return 1
+    return min(max(limit, 1), MAX_PULL_COMMANDS)
+
+
+def parse_wait(request):
+    try:
+        wait = float(request.GET.get("wait") or 0)
+    except ValueError:
+        return 0.0
+    if not math.isfinite(wait):
+        return 0.0
+    return min(max(wait, 0.0), settings.AGENT_COMMAND_LONG_POLL_MAX)
+
+
+def wait_for_commands(drone, wait, limit=1):
+    # Subscribing before the first claim means a command enqueued in between still wakes us.
+    with command_bus.subscribe(drone.pk) as subscription:
+        commands = claim_commands(drone, limit)
+        deadline = time.monotonic() + wait
+        while not commands:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not subscription.wait(remaining):
+                break
+            commands = claim_commands(drone, limit)
+    return commands
+
+
+@csrf_exempt
+def pull_commands(request):
+    if request.method != "GET":
+        return json_error("method_not_allowed", status=405)
+
+    drone, error = authorize_drone(request, "commands", request.GET.get("drone_id"))
+    if error:
+        return error
+
+    try:
+        commands = wait_for_commands(drone, parse_wait(request), parse_max(request.GET.get("max")))
+    except (OperationalError, ProgrammingError):
+        commands = []
+
+    return command_response(commands)
+
+
+def parse_acks(payload):
+    # A JSON list or {"acks": [...]} is a batch; a bare object is the original single-ack form.
+    if isinstance(payload, list):
+        return payload, True
+    if isinstance(payload.get("acks"), list):
+        return payload["acks"], True
+    return [payload], False
+
+
+def ack_response(results, batch):
+    if batch:
+        return JsonResponse({"ok": True, "acks": results})
+    error = results[0].get("error")
+    if error:
+        return json_error(error, status=404 if error == "command_not_found" else 400)
+    return JsonResponse({"ok": True})
+
+
 @csrf_exempt
 def ack_command(request):
     if request.method != "POST":
         return json_error("method_not_allowed", status=405)
 
+    drone, error = authorize_drone(request, "ack", request.GET.get("drone_id"))
+    if error:
+        return error
+
     payload = parse_json_body(request)
-    if payload is None:
+    if not isinstance(payload, (dict, list)):
         return json_error("invalid_json", status=400)
+    if isinstance(payload, dict) and not drone_matches(drone, payload.get("drone_id")):
+        return json_error("invalid_token", status=401)
+    acks, batch = parse_acks(payload)
+    if len(acks) > MAX_BATCH_ACKS:
+        return json_error("batch_too_large", status=413)
+
+    try:
+        with transaction.atomic():
+            results = apply_acks(drone, acks, request)
+    except (OperationalError, ProgrammingError):
+        return json_error("service_unavailable", status=503)
+
+    return ack_response(results, batch)
 
-    drone_id = payload.get("drone_id")
-    if not drone_id:
-        return json_error("missing_drone_id", status=400)
 
-    drone, error = authorize_drone(request, drone_id)
+@csrf_exempt
+def route_geometry(request, digest):
+    if request.method != "GET":
+        return json_error("method_not_allowed", status=405)
+
+    drone, error = authorize_drone(request, "routes", request.GET.get("drone_id"))
     if error:
         return error
 
-    command_id = payload.get("command_id")
-    status = payload.get("status")
-    if not command_id:
-        return json_error("missing_command_id", status=400)
+    # The URL names the content, so a matching ETag never needs a database lookup.
+    etag = quote_etag(digest)
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        try:
+            geometry = (
+                RouteGeometry.objects.filter(digest=digest)
+                .values_list("geometry", flat=True)
+                .first()
+            )
+        except (OperationalError, ProgrammingError):
+            return json_error("service_unavailable", status=503)
+        if geometry is None:
+            return json_error("route_not_found", status=404)
+        response = HttpResponse(canonical_geometry(geometry), content_type="application/json")
+    response["ETag"] = etag
+    response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+def parse_command_id(value):
+    # Only ints and ASCII digit strings; str.isdigit() also accepts "²", which int() rejects.
+    # Ids past the BigAutoField range would overflow the database driver.
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str) and value.isascii() and value.isdigit():
+        value = int(value) if len(value) <= len(str(MAX_COMMAND_ID)) else None
+    if isinstance(value, int) and 0 < value <= MAX_COMMAND_ID:
+        return value
+    return None
+
+
+def apply_acks(drone, acks, request=None):
+    # One SELECT, one bulk UPDATE and one bulk audit insert, whatever the number of acks.
+    results = []
+    valid = {}
+    for ack in acks:
+        ack = ack if isinstance(ack, dict) else {}
+        command_id = ack.get("command_id")
+        error = None
+        if not command_id:
+            error = "missing_command_id"
+        elif parse_command_id(command_id) is None:
+            error = "invalid_command_id"
+        elif not isinstance(ack.get("status"), str) or ack["status"] not in ACK_STATUSES:
+            error = "invalid_status"
+        if error:
+            results.append({"command_id": command_id, "ok": False, "error": error})
+            continue
+        results.append({"command_id": command_id, "ok": True})
+        valid[parse_command_id(command_id)] = (ack["status"], ack.get("result") or {})
+
+    commands = []
+    if valid:
+        found = AgentCommand.objects.filter(drone=drone, id__in=list(valid)).only("id")
+        acked_at = timezone.now()
+        for command in found:
+            command.status, command.result = valid[command.id]
+            command.acked_at = acked_at
+            commands.append(command)
+        AgentCommand.objects.bulk_update(commands, ["status", "acked_at", "result"])
+        log_events(
+            None,
+            "agent_ack",
+            "AgentCommand",
+            [
+                (command.id, {"status": command.status, "drone_id": drone.serial})
+                for command in commands
+            ],
+            request=request,
+        )
+
+    found_ids = {command.id for command in commands}
+    for result in results:
+        if result["ok"] and parse_command_id(result["command_id"]) not in found_ids:
+            result.update(ok=False, error="command_not_found")
+    return results
+
+
+@csrf_exempt
+def heartbeat(request):
+    if request.method != "POST":
+        return json_error("method_not_allowed", status=405)
 
-    if status not in {AgentCommand.Status.ACKED, AgentCommand.Status.FAILED}:
-        return json_error("invalid_status", status=400)
+    drone, error = authorize_drone(request, "heartbeat", request.GET.get("drone_id"))
+    if error:
+        return error
+
+    payload = parse_json_body(request)
+    if not isinstance(payload, dict):
+        return json_error("invalid_json", status=400)
+    if not drone_matches(drone, payload.get("drone_id")):
+        return json_error("invalid_token", status=401)
+
+    telemetry_payload = payload.get("telemetry")
+    samples = [] if telemetry_payload is None else samples_from_json(telemetry_payload)
+    samples = clean_samples(samples)
+    if samples is None:
+        return json_error("invalid_samples", status=400)
+    acks = payload.get("acks") or []
+    if not isinstance(acks, list):
+        return json_error("invalid_acks", status=400)
+    if len(samples) > MAX_BATCH_SAMPLES or len(acks) > MAX_BATCH_ACKS:
+        return json_error("batch_too_large", status=413)
+
+    samples, dropped = sequence_guard.filter(drone.pk, samples)
+    try:
+        samples, changed = delta_tracker.resolve(drone.pk, samples)
+    except ResyncRequired as exc:
+        return resync_response(exc)
 
     try:
-        command = AgentCommand.objects.get(id=command_id, drone=drone)
-    except AgentCommand.DoesNotExist:
-        return json_error("command_not_found", status=404)
+        with transaction.atomic():
+            if samples:
+                record_samples(drone, samples, timezone.now(), changed)
+            ack_results = apply_acks(drone, acks, request)
+            commands = claim_commands(drone, parse_max(payload.get("max")))
     except (OperationalError, ProgrammingError):
         return json_error("service_unavailable", status=503)
+    sequence_guard.advance(drone.pk, samples)
 
-    command.status = status
-    command.acked_at = timezone.now()
-    command.result = payload.get("result") or {}
-    command.save(update_fields=["status", "acked_at", "result"])
-
-    log_event(
-        actor=None,
-        action="agent_ack",
-        object_type="AgentCommand",
-        object_id=str(command.id),
-        request=request,
-        metadata={"status": status, "drone_id": drone.serial},
+    return JsonResponse(
+        {
+            "ok": True,
+            "accepted": len(samples),
+            "dropped": dropped,
+            "ack_seq": delta_tracker.ack_seq(drone.pk),
+            "acks": ack_results,
+            "command": serialize_command(commands[0]) if commands else None,
+            "commands": [serialize_command(command) for command in commands],
+        }
     )
 
-    return JsonResponse({"ok": True})
-
 
-# Example curl:
+# Example curl (the bearer token identifies the drone; drone_id is optional):
 # curl -X POST https://XXXX.ngrok-free.app/api/agent/register/ \
 #   -H "Authorization: Bearer TOKEN" \
 #   -H "Content-Type: application/json" \
-#   -d '{"drone_id":"DRX-001","agent_version":"1.0.0","mode":"SIMULATION","system":{}}'
+#   -d '{"agent_version":"1.0.0","mode":"SIMULATION","system":{}}'
+#
+# Batched telemetry (JSON array or NDJSON, one write per request):
+# curl -X POST https://XXXX.ngrok-free.app/api/agent/telemetry/ \
+#   -H "Authorization: Bearer TOKEN" \
+#   -H "Content-Type: application/x-ndjson" \
+#   --data-binary $'{"ts":"2024-01-01T10:00:00Z","lat":4.6,"lng":-74.1}\n{"ts":"2024-01-01T10:00:01Z","lat":4.61,"lng":-74.1}\n'
+#
+# Gateway relaying several drones (one bulk write for all of them):
+# curl -X POST https://XXXX.ngrok-free.app/api/agent/telemetry/gateway/ \
+#   -H "Content-Type: application/json" \
+#   -d '{"drones":[{"drone_id":"DRX-001","token":"TOKEN1","lat":4.6},{"drone_id":"DRX-002","token":"TOKEN2","samples":[{"lat":4.7}]}]}'
+#
+# Packed binary frames (see integrations/wire.py) use the same endpoints:
+# curl -X POST "https://XXXX.ngrok-free.app/api/agent/telemetry/?drone_id=DRX-001" \
+#   -H "Authorization: Bearer TOKEN" \
+#   -H "Content-Type: application/vnd.dronex.telemetry" \
+#   --data-binary @frame.bin
+#
+# Long-poll for commands: the request returns as soon as one is enqueued, or after `wait`
+# seconds (capped by AGENT_COMMAND_LONG_POLL_MAX) with {"command": null}.
+# Add max=N to drain up to N queued commands in one round trip.
+# curl "https://XXXX.ngrok-free.app/api/agent/commands/pull/?wait=25&max=10" \
+#   -H "Authorization: Bearer TOKEN"
+#
+# Signed requests skip the bearer token: KEY is the "signing_key" returned by a bearer
+# register call and the signature is, as hex,
+# HMAC-SHA256(KEY, METHOD + "\n" + PATH_WITH_QUERY + "\n" + TS + "\n" + sha256(BODY)).
+# A signature is accepted once; add X-Drone-Nonce (appended as "\n" + NONCE) to repeat an
+# identical request within the same second.
+# curl -X POST https://XXXX.ngrok-free.app/api/agent/telemetry/ \
+#   -H "X-Drone-Id: DRX-001" -H "X-Drone-Timestamp: 1704103200" -H "X-Drone-Signature: SIG" \
+#   -H "Content-Type: application/json" \
+#   -d '{"lat":4.6,"lng":-74.1}'
+#
+# Batched acks after a reconnect (one bulk update, per-item results):
+# curl -X POST https://XXXX.ngrok-free.app/api/agent/ack/ \
+#   -H "Authorization: Bearer TOKEN" \
+#   -H "Content-Type: application/json" \
+#   -d '{"acks":[{"command_id":12,"status":"ACKED"},{"command_id":13,"status":"FAILED","result":{"error":"gps"}}]}'
+#
+# Heartbeat: latest telemetry, pending acks and the next commands in one request.
+# curl -X POST https://XXXX.ngrok-free.app/api/agent/heartbeat/ \
+#   -H "Authorization: Bearer TOKEN" \
+#   -H "Content-Type: application/json" \
+#   -d '{"telemetry":{"lat":4.6,"lng":-74.1},"acks":[{"command_id":12,"status":"ACKED"}],"max":5}'
+#
+# START_MISSION payloads reference the route geometry by hash. The body served here hashes
+# (sha256) to route_hash, so agents that already hold that version skip the download.
+# curl "https://XXXX.ngrok-free.app/api/agent/routes/ROUTE_HASH/" \
+#   -H "Authorization: Bearer TOKEN" -H 'If-None-Match: "ROUTE_HASH"'
+#
+# Delta telemetry: send only changed fields against the last acknowledged sequence
+# number. A 409 "resync_required" answer means the next sample must be a full one.
+# curl -X POST https://XXXX.ngrok-free.app/api/agent/telemetry/ \
+#   -H "Authorization: Bearer TOKEN" \
+#   -H "Content-Type: application/json" \
+#   -d '{"drone_id":"DRX-001","mode":"delta","seq":43,"base_seq":42,"battery":78}'
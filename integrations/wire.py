@@ -0,0 +1,142 @@
+import math
+import struct
+from collections import namedtuple
+
+BINARY_CONTENT_TYPE = "application/vnd.dronex.telemetry"
+WIRE_VERSION = 1
+
+# Little-endian, fixed layout. Missing floats are NaN, missing integers use the type's max value.
+FRAME_HEADER = struct.Struct("<4sBH")  # magic, version, record or drone count
+RECORD = struct.Struct("<dddfBBHB")  # ts, lat, lng, alt, battery, signal, heading, flags
+BLOCK_COUNT = struct.Struct("<H")
+SAMPLE_MAGIC = b"DRXT"
+GATEWAY_MAGIC = b"DRXG"
+
+UINT8_NONE = 0xFF
+UINT16_NONE = 0xFFFF
+FLAG_LOST_LINK = 0x01
+
+
+class PackedSample(namedtuple("PackedSample", "ts lat lng alt battery signal heading status")):
+    __slots__ = ()
+
+    def get(self, key, default=None):
+        value = getattr(self, key) if key in self._fields else None
+        return default if value is None else value
+
+
+def _float_or_none(value):
+    # NaN marks a missing value; infinities would pass straight through to the database.
+    if math.isnan(value):
+        return None
+    if math.isinf(value):
+        raise ValueError("non-finite value")
+    return value
+
+
+def _unpack_records(body, offset, count):
+    end = offset + RECORD.size * count
+    if count and len(body) < end:
+        raise ValueError("truncated records")
+    samples = []
+    for ts, lat, lng, alt, battery, signal, heading, flags in RECORD.iter_unpack(body[offset:end]):
+        samples.append(
+            PackedSample(
+                _float_or_none(ts),
+                _float_or_none(lat),
+                _float_or_none(lng),
+                _float_or_none(alt),
+                None if battery == UINT8_NONE else battery,
+                None if signal == UINT8_NONE else signal,
+                None if heading == UINT16_NONE else heading,
+                "LOST_LINK" if flags & FLAG_LOST_LINK else None,
+            )
+        )
+    return samples, end
+
+
+def _read_header(body, magic):
+    if len(body) < FRAME_HEADER.size:
+        raise ValueError("truncated header")
+    frame_magic, version, count = FRAME_HEADER.unpack_from(body)
+    if frame_magic != magic or version != WIRE_VERSION:
+        raise ValueError("unsupported frame")
+    return count
+
+
+def _read_string(body, offset):
+    if len(body) < offset + 1:
+        raise ValueError("truncated string")
+    length = body[offset]
+    end = offset + 1 + length
+    if len(body) < end:
+        raise ValueError("truncated string")
+    return body[offset + 1 : end].decode("utf-8"), end
+
+
+def decode_samples(body):
+    try:
+        count = _read_header(body, SAMPLE_MAGIC)
+        samples, end = _unpack_records(body, FRAME_HEADER.size, count)
+    except (ValueError, struct.error):
+        return None
+    if end != len(body):
+        return None
+    return samples
+
+
+def decode_gateway(body):
+    entries = []
+    try:
+        count = _read_header(body, GATEWAY_MAGIC)
+        offset = FRAME_HEADER.size
+        for _ in range(count):
+            drone_id, offset = _read_string(body, offset)
+            token, offset = _read_string(body, offset)
+            (records,) = BLOCK_COUNT.unpack_from(body, offset)
+            samples, offset = _unpack_records(body, offset + BLOCK_COUNT.size, records)
+            entries.append({"drone_id": drone_id, "token": token or None, "samples": samples})
+    except (ValueError, UnicodeDecodeError, struct.error):
+        return None
+    if offset != len(body):
+        return None
+    return entries
+
+
+def _pack_records(samples):
+    def number(sample, key):
+        value = sample.get(key)
+        return math.nan if value is None else float(value)
+
+    def integer(sample, key, missing):
+        value = sample.get(key)
+        return missing if value is None else int(value)
+
+    return b"".join(
+        RECORD.pack(
+            number(sample, "ts"),
+            number(sample, "lat"),
+            number(sample, "lng"),
+            number(sample, "alt"),
+            integer(sample, "battery", UINT8_NONE),
+            integer(sample, "signal", UINT8_NONE),
+            integer(sample, "heading", UINT16_NONE),
+            FLAG_LOST_LINK if sample.get("status") in {"LOST_LINK", "NO_SIGNAL"} else 0,
+        )
+        for sample in samples
+    )
+
+
+def encode_samples(samples):
+    return FRAME_HEADER.pack(SAMPLE_MAGIC, WIRE_VERSION, len(samples)) + _pack_records(samples)
+
+
+def encode_gateway(entries):
+    parts = [FRAME_HEADER.pack(GATEWAY_MAGIC, WIRE_VERSION, len(entries))]
+    for entry in entries:
+        for text in (entry["drone_id"], entry.get("token") or ""):
+            encoded = text.encode("utf-8")
+            parts.append(bytes([len(encoded)]) + encoded)
+        parts.append(BLOCK_COUNT.pack(len(entry["samples"])))
+        parts.append(_pack_records(entry["samples"]))
+    return b"".join(parts)
@@ -12,11 +12,14 @@ from django.views.decorators.http import require_POST
 from django.views.generic import CreateView, DeleteView, ListView, UpdateView
 
 from accounts.decorators import role_required
-from alerts.models import Alert
 from accounts.mixins import RoleRequiredMixin
 from audit.utils import log_event
+from dashboard.stats import fleet_stats
 from fleet.models import Drone
+from integrations.buffer import state_buffer
+from integrations.command_archive import command_history
 from integrations.models import AgentCommand
+from integrations.routes import mission_payload
 
 from .forms import DispatchShiftForm, OperationSessionForm, RouteForm, ShiftForm
 from .models import OperationSession, Route, Shift
@@ -169,18 +172,12 @@ def start_operation(request):
             shift.status = Shift.Status.ACTIVE
             shift.save(update_fields=["status"])
             Drone.objects.filter(id=shift.drone_id).update(status=Drone.Status.IN_USE)
-            payload = {
-                "session_id": session.id,
-                "route_name": shift.route.name,
-                "waypoints": shift.route.waypoints,
-                "zone_geojson": shift.route.zone_geojson,
-            }
             command = AgentCommand.objects.create(
                 drone=shift.drone,
                 created_by=request.user,
                 session=session,
                 command=AgentCommand.CommandType.START_MISSION,
-                payload=payload,
+                payload=mission_payload(session, shift.route),
             )
             log_event(request.user, "start_operation", "OperationSession", str(session.id), request)
             log_event(
@@ -285,14 +282,12 @@ def operation_center(request):
         )
         current_session = None
         command_queue = []
-        alerts_open = Alert.objects.filter(status=Alert.Status.OPEN).count()
+        alerts_open = fleet_stats.get()["alerts_open"]
         if shift:
             current_session = OperationSession.objects.filter(
                 shift=shift, status=OperationSession.Status.RUNNING
             ).first()
-            command_queue = AgentCommand.objects.filter(drone=shift.drone).order_by(
-                "-created_at"
-            )[:6]
+            command_queue = command_history(shift.drone, limit=6)
     except (OperationalError, ProgrammingError):
         requires_migrations = True
         shift = None
@@ -301,6 +296,8 @@ def operation_center(request):
         alerts_open = 0
 
     agent_online = False
+    if shift:
+        state_buffer.overlay(shift.drone)
     if shift and shift.drone.last_seen:
         agent_online = shift.drone.last_seen >= now - timedelta(minutes=10)
 